@@ -1,17 +1,30 @@
+import atexit
+import functools
+import hmac
+import html
 import logging
 import streamlit as st
-from anthropic import Anthropic
-from notion_client import Client, APIResponseError
-from supabase import create_client
-from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, NamedTuple
 import json
+import re
+import time
 
-from modules.notion_utils import NotionHelper
+from modules.notion_utils import NotionHelper, slugify, throttled
 from modules.ui_editor import render_dynamic_editor
 from modules.assistant_tools import AssistantOps
 from modules.logger import EventLogger
-from modules.sync import setup_autorefresh
-from modules.claude_tools import TOOLS, build_system_prompt, execute_tool as run_claude_tool
+from modules.tool_schema import TOOLS, WRITE_TOOLS
+from modules.claude_tools import (
+    build_system_prompt,
+    clear_task_lookup_cache,
+    date_context,
+    execute_tools as run_claude_tools,
+)
+
+if TYPE_CHECKING:
+    from notion_client import Client
 
 logger = logging.getLogger("project_assistant")
 if not logger.handlers:
@@ -26,6 +39,16 @@ if "last_task_fetch" not in st.session_state:
 
 ANTHROPIC_MODEL = "claude-haiku-4-5-20251001"
 
+# One clock read per rerun; TODAY stays in server-local time like the old default
+NOW = datetime.now(timezone.utc)
+TODAY = NOW.astimezone().date()
+_TODAY_FMT = "%Y-%m-%d"
+STATUS_ICONS = {"To Do": "○", "In Progress": "↻", "Done": "✓", "Blocked": "×"}
+# Only the most recent messages are replayed on each rerun
+MAX_RENDER = 20
+# Window for the "completed recently" count loaded alongside active tasks
+RECENT_DONE_DAYS = 7
+
 
 def _get_block_attr(block, attr, default=None):
     if hasattr(block, attr):
@@ -57,6 +80,18 @@ def _render_message_content(content):
     return content
 
 
+@st.cache_data(max_entries=200, show_spinner=False)
+def _render_cached(content_key: str):
+    return _render_message_content(json.loads(content_key))
+
+
+def _render_message(content):
+    # Plain strings render as-is; block lists are keyed on their JSON form
+    if not isinstance(content, list):
+        return content
+    return _render_cached(json.dumps(content, sort_keys=True, default=str))
+
+
 def _serialize_block(block):
     if hasattr(block, "model_dump"):
         return block.model_dump()
@@ -73,14 +108,11 @@ st.set_page_config(page_title="Project Assistant", page_icon="🚀", layout="wid
 
 # ---------- Notion SDK 2.7.0+ compatibility (data_sources) ----------
 # Provides databases.query compatibility by routing to data_sources.query.
-_DSID_CACHE: dict[str, str] = {}
-
-
-def _get_first_data_source_id(notion_client: Client, database_id: str) -> str:
-    if database_id in _DSID_CACHE:
-        logger.debug("Notion data_source_id cache hit for %s", database_id)  # DEV-LOG
-        return _DSID_CACHE[database_id]
-    db = notion_client.databases.retrieve(database_id=database_id)
+# The leading underscore keeps Streamlit from hashing the client; results are
+# cached per database_id for the lifetime of the process.
+@st.cache_resource(show_spinner=False)
+def _get_first_data_source_id(_notion_client: "Client", database_id: str) -> str:
+    db = throttled(_notion_client.databases.retrieve, database_id=database_id)
     data_sources = db.get("data_sources") or []
     logger.info(
         "Retrieved %d data_sources for database %s",
@@ -92,12 +124,11 @@ def _get_first_data_source_id(notion_client: Client, database_id: str) -> str:
             "No data_sources found for this database. Open it in Notion and ensure it has at least one data source."
         )
     dsid = data_sources[0]["id"]
-    _DSID_CACHE[database_id] = dsid
     logger.info("Using data_source_id %s for database %s", dsid, database_id)
     return dsid
 
 
-def _enable_notion_datasource_compat(notion_client: Client) -> None:
+def _enable_notion_datasource_compat(notion_client: "Client") -> None:
     """
     If the SDK exposes data_sources, add a shim so
     notion_client.databases.query(...) keeps working.
@@ -121,19 +152,50 @@ def _enable_notion_datasource_compat(notion_client: Client) -> None:
 
 
 # ---------- Clients ----------
+HTTP_POOL_LIMITS = {"max_keepalive_connections": 20, "max_connections": 40}
+
+
 @st.cache_resource
 def init_clients():
+    # SDK imports are deferred so their import graph loads once per process
+    import httpx
+    from anthropic import Anthropic, DefaultHttpxClient
+    from notion_client import Client
+    from supabase import ClientOptions, create_client
+
     logger.info("Initializing external clients")
-    anthropic = Anthropic(api_key=st.secrets["ANTHROPIC_API_KEY"])
+    # One keep-alive HTTP/2 pool per SDK. They are not shared: notion-client
+    # installs its auth header as a default on the httpx client it is given.
+    anthropic = Anthropic(
+        api_key=st.secrets["ANTHROPIC_API_KEY"],
+        http_client=DefaultHttpxClient(http2=True, limits=httpx.Limits(**HTTP_POOL_LIMITS)),
+    )
     logger.info("Anthropic client initialized")
 
-    notion = Client(auth=st.secrets["NOTION_TOKEN"])
+    notion = Client(
+        auth=st.secrets["NOTION_TOKEN"],
+        client=httpx.Client(http2=True, limits=httpx.Limits(**HTTP_POOL_LIMITS)),
+    )
     _enable_notion_datasource_compat(notion)
+    if hasattr(notion, "data_sources"):
+        # Resolve the data source up front so the first task query skips the extra retrieve
+        try:
+            _get_first_data_source_id(notion, st.secrets["NOTION_DATABASE_ID"])
+        except Exception:
+            logger.warning("Could not pre-resolve Notion data_source_id", exc_info=True)
     logger.info("Notion client initialized")
 
     supabase = None
     try:
-        supabase = create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+        supabase = create_client(
+            st.secrets["SUPABASE_URL"],
+            st.secrets["SUPABASE_KEY"],
+            options=ClientOptions(
+                httpx_client=httpx.Client(
+                    http2=True, limits=httpx.Limits(**HTTP_POOL_LIMITS), timeout=30.0
+                ),
+            ),
+        )
         logger.info("Supabase client initialized")
     except Exception:
         # Supabase is optional for logging, keep running if not configured
@@ -145,31 +207,81 @@ def init_clients():
     return anthropic, notion, supabase
 
 
+class AppConfig(NamedTuple):
+    notion_db_id: str
+    notion_token: str
+    admins: frozenset
+    auth_username: str
+    auth_password: str
+
+
+@st.cache_resource
+def _load_config() -> AppConfig:
+    """Read secrets once per process instead of on every rerun."""
+    admins = frozenset(x.strip() for x in st.secrets.get("ADMINS", "").split(",") if x.strip())
+    return AppConfig(
+        notion_db_id=st.secrets["NOTION_DATABASE_ID"],
+        notion_token=st.secrets["NOTION_TOKEN"],
+        admins=admins,
+        auth_username=st.secrets["AUTH_USERNAME"],
+        auth_password=st.secrets["AUTH_PASSWORD"],
+    )
+
+
 ANTHROPIC, NOTION, SUPABASE = init_clients()
-NOTION_DB_ID = st.secrets["NOTION_DATABASE_ID"]
+CONFIG = _load_config()
+NOTION_DB_ID = CONFIG.notion_db_id
 
 
-def execute_tool(tool_name: str, tool_input: dict) -> dict:
+def execute_tools(tool_calls: list[dict]) -> list[dict]:
     """Proxy tool execution through the shared Notion client."""
-    return run_claude_tool(tool_name, tool_input, NOTION, NOTION_DB_ID)
+    return run_claude_tools(tool_calls, NOTION, NOTION_DB_ID)
 
 
 # ---------- App services ----------
 # Your NotionHelper requires a notion_token, pass it explicitly
-NOTION_HELPER = NotionHelper(NOTION, NOTION_DB_ID, st.secrets["NOTION_TOKEN"])
+@st.cache_resource
+def _notion_helper(database_id: str, notion_token: str) -> NotionHelper:
+    # One helper per process so its schema cache and HTTP pool outlive reruns
+    helper = NotionHelper(NOTION, database_id, notion_token)
+    atexit.register(helper.close)
+    return helper
+
+
+NOTION_HELPER = _notion_helper(NOTION_DB_ID, CONFIG.notion_token)
 ASSIST_OPS = AssistantOps(ANTHROPIC)
-LOGGER = EventLogger(SUPABASE)
+# Events queue in session_state and go to Supabase as one bulk insert;
+# anything queued during the previous run is flushed at the top of this one.
+LOGGER = EventLogger(SUPABASE, pending=st.session_state.setdefault("_log_buffer", []))
+LOGGER.flush_pending()
 
 
-def invalidate_task_cache() -> None:
+def invalidate_task_cache(titles_changed: bool = True) -> None:
     st.session_state.last_task_fetch = None
     st.session_state.cached_tasks = []
+    if titles_changed:
+        clear_task_lookup_cache()
 
 
 def get_current_tasks() -> list[dict]:
     return NOTION_HELPER.list_active_task_pages()
 
 
+@st.cache_resource
+def _background_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for overlapping Notion reads with Anthropic calls."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+
+def store_prefetched_tasks(future: Future) -> None:
+    """Store a background get_current_tasks() result; runs on the script thread."""
+    try:
+        st.session_state.cached_tasks = future.result()
+        st.session_state.last_task_fetch = datetime.now()
+    except Exception:
+        logger.exception("Failed to prefetch Notion tasks for chat context")
+
+
 def get_current_tasks_cached() -> list[dict]:
     should_refresh = (
         st.session_state.last_task_fetch is None
@@ -185,6 +297,98 @@ def get_current_tasks_cached() -> list[dict]:
     return st.session_state.cached_tasks
 
 
+CHAT_TOKEN_BUDGET = 4000
+TOOL_RESULT_MAX_CHARS = 500
+# Cap for the tool_result sent on the turn that produced it
+TOOL_RESULT_SEND_MAX_CHARS = 2000
+
+
+def _estimate_tokens(content) -> int:
+    # ~4 characters per token; avoids a count_tokens round-trip per call
+    text = content if isinstance(content, str) else json.dumps(content, default=str)
+    return len(text) // 4 + 1
+
+
+def _compact_message(message: dict) -> dict:
+    content = message["content"]
+    if isinstance(content, list):
+        compacted = []
+        for block in content:
+            text = block.get("content")
+            if block.get("type") == "tool_result" and isinstance(text, str) and len(text) > TOOL_RESULT_MAX_CHARS:
+                omitted = len(text) - TOOL_RESULT_MAX_CHARS
+                block = {**block, "content": f"{text[:TOOL_RESULT_MAX_CHARS]}...[{omitted} chars omitted]"}
+            compacted.append(block)
+        content = compacted
+    return {"role": message["role"], "content": content}
+
+
+def _tool_result_content(result) -> str:
+    # JSON rather than repr so the model sees a stable, parseable payload
+    text = json.dumps(result, ensure_ascii=False, default=str)
+    if len(text) > TOOL_RESULT_SEND_MAX_CHARS:
+        omitted = len(text) - TOOL_RESULT_SEND_MAX_CHARS
+        text = f"{text[:TOOL_RESULT_SEND_MAX_CHARS]}...[{omitted} chars omitted]"
+    return text
+
+
+def _is_plain_user_turn(message: dict) -> bool:
+    if message["role"] != "user":
+        return False
+    content = message["content"]
+    return not (isinstance(content, list) and any(b.get("type") == "tool_result" for b in content))
+
+
+def _trim_messages(messages: list[dict], max_tokens: int = CHAT_TOKEN_BUDGET) -> list[dict]:
+    """
+    Keep the current turn (from the latest user prompt on) plus as much older
+    history as fits the token budget. Only older tool results are shortened;
+    the current turn's keep their TOOL_RESULT_SEND_MAX_CHARS form.
+    """
+    start = next(
+        (i for i in range(len(messages) - 1, -1, -1) if _is_plain_user_turn(messages[i])),
+        0,
+    )
+    kept = [{"role": m["role"], "content": m["content"]} for m in messages[start:]]
+    used = sum(_estimate_tokens(m["content"]) for m in kept)
+
+    older: list[dict] = []
+    for m in reversed(messages[:start]):
+        m = _compact_message(m)
+        cost = _estimate_tokens(m["content"])
+        if used + cost > max_tokens:
+            break
+        older.append(m)
+        used += cost
+    older.reverse()
+    # Open the window on a user prompt so tool_use/tool_result pairs stay intact
+    while older and not _is_plain_user_turn(older[0]):
+        older.pop(0)
+    return older + kept
+
+
+def stream_claude(system_prompt, messages: list[dict]):
+    """Render Claude's text as it streams in and return the final message."""
+    with ANTHROPIC.messages.stream(
+        model=ANTHROPIC_MODEL,
+        max_tokens=2048,
+        system=system_prompt,
+        tools=TOOLS,
+        messages=_trim_messages(messages),
+    ) as stream:
+        st.write_stream(stream.text_stream)
+        final = stream.get_final_message()
+    usage = getattr(final, "usage", None)
+    if usage is not None:
+        logger.info(
+            "Claude usage: input=%s cache_read=%s cache_write=%s",
+            usage.input_tokens,
+            getattr(usage, "cache_read_input_tokens", None),
+            getattr(usage, "cache_creation_input_tokens", None),
+        )
+    return final
+
+
 def save_message(role: str, content: str) -> None:
     """Persist chat messages via the EventLogger."""
     try:
@@ -193,8 +397,11 @@ def save_message(role: str, content: str) -> None:
         logger.exception("Failed to save %s message", role)
 
 
-AUTH_USERNAME = "assiomar"
-AUTH_PASSWORD = "wBmTt$Wcf3poo@ZEX$"
+def _credentials_match(username: str, password: str) -> bool:
+    # Constant-time compare; evaluate both so timing doesn't reveal which one failed
+    user_ok = hmac.compare_digest(username.encode(), CONFIG.auth_username.encode())
+    pass_ok = hmac.compare_digest(password.encode(), CONFIG.auth_password.encode())
+    return user_ok & pass_ok
 
 # ---------- Auth ----------
 if not st.session_state.get("auth_ok"):
@@ -205,7 +412,7 @@ if not st.session_state.get("auth_ok"):
         submitted = st.form_submit_button("Sign In")
 
     if submitted:
-        if username == AUTH_USERNAME and password == AUTH_PASSWORD:
+        if _credentials_match(username, password):
             st.session_state.auth_ok = True
             st.session_state.user_id = username
             st.rerun()
@@ -213,14 +420,16 @@ if not st.session_state.get("auth_ok"):
             st.error("Invalid username or password")
     st.stop()
 
-USER_ID = st.session_state.get("user_id", AUTH_USERNAME)
-ADMINS = set([x.strip() for x in st.secrets.get("ADMINS", "").split(",") if x.strip()])
+USER_ID = st.session_state.get("user_id", CONFIG.auth_username)
+ADMINS = CONFIG.admins
 IS_ADMIN = (not ADMINS) or (USER_ID in ADMINS)
 
 # ---------- Sidebar: controls ----------
 with st.sidebar:
     st.caption(f"User: {USER_ID} {'[admin]' if IS_ADMIN else ''}")
-    setup_autorefresh(seconds=120)
+    from modules.sync import setup_autorefresh
+
+    refresh_count = setup_autorefresh(seconds=120)
 
     if st.button("🔄 Refresh tasks"):
         logger.info("Manual task refresh triggered by %s", USER_ID)
@@ -231,113 +440,233 @@ with st.sidebar:
         st.rerun()
 
 # ---------- Load tasks ----------
-@st.cache_data(ttl=60)
-def fetch_active_tasks():
+# Tasks live only in session_state (no st.cache_data), so reruns never pay a
+# pickle round-trip. Invalidation is event-driven: our own writes patch the
+# list locally and bump tasks_version; Notion is fully re-read only on first
+# load or manual refresh. Autorefresh ticks (the external-edit signal) fetch
+# only pages edited since the last sync.
+def fetch_task_bundle():
     try:
-        tasks = NOTION_HELPER.list_active_tasks()
+        bundle = NOTION_HELPER.load_bundle(days=RECENT_DONE_DAYS)
         logger.info(
-            "Fetched %d active tasks from Notion database %s",
-            len(tasks),
+            "Fetched %d active and %d recently completed tasks from Notion database %s",
+            len(bundle.active),
+            len(bundle.completed or ()),
             NOTION_DB_ID,
         )
-        return tasks
+        return bundle
     except Exception:
         logger.exception(
             "Failed to fetch tasks from Notion database %s", NOTION_DB_ID
         )
         raise
 
+
+def set_tasks(tasks: list[dict]) -> None:
+    """Store tasks in session_state along with title and id indexes for O(1) lookups."""
+    by_title: dict[str, dict] = {}
+    for t in tasks:
+        # Keep the first task per title, matching the previous linear scan
+        by_title.setdefault(t["title"], t)
+    st.session_state.tasks = tasks
+    st.session_state.by_title = by_title
+    st.session_state.by_id = {t["id"]: t for t in tasks}
+    st.session_state.by_title_lower = {title.lower(): t for title, t in by_title.items()}
+
+
+def mark_tasks_changed() -> None:
+    st.session_state.tasks_version = st.session_state.get("tasks_version", 0) + 1
+
+
+def load_tasks() -> None:
+    bundle = fetch_task_bundle()
+    tasks = bundle.active
+    set_tasks(tasks)
+    if bundle.completed is None:
+        # Optional query failed; hide the caption rather than show a wrong count
+        st.session_state.pop("recent_done_count", None)
+    else:
+        st.session_state.recent_done_count = len(bundle.completed)
+    st.session_state.tasks_synced_at = NotionHelper.latest_edit(tasks)
+
+
+def sync_tasks() -> None:
+    """Pull only pages edited since the last sync into the task list."""
+    try:
+        tasks, synced_at = NOTION_HELPER.list_active_tasks_incremental(
+            st.session_state.tasks, st.session_state.get("tasks_synced_at")
+        )
+    except Exception:
+        logger.exception("Incremental task sync failed; doing a full reload")
+        load_tasks()
+        return
+    set_tasks(tasks)
+    st.session_state.tasks_synced_at = synced_at
+
+
+def add_task_local(task: dict) -> None:
+    """Apply a newly created task to the in-memory list without refetching."""
+    mark_tasks_changed()
+    set_tasks(st.session_state.tasks + [task])
+
+
+def remove_task_local(page_id: str) -> None:
+    """Drop an archived task from the in-memory list without refetching."""
+    mark_tasks_changed()
+    if page_id in st.session_state.by_id:
+        set_tasks([t for t in st.session_state.tasks if t["id"] != page_id])
+
+
+def patch_task_local(page_id: str, properties: dict) -> None:
+    """Patch a task in place; the next autorefresh reconciles anything missed."""
+    mark_tasks_changed()
+    task = st.session_state.by_id.get(page_id)
+    if task:
+        props = task.setdefault("properties", {})
+        for name, value in properties.items():
+            props[name] = value
+            task[slugify(name)] = value
+        set_tasks(st.session_state.tasks)
+
+
+# Local deltas keep the list current after our own writes; autorefresh ticks
+# merge in pages edited since the last sync to pick up external edits.
+autorefresh_tick = refresh_count != st.session_state.get("last_refresh_count", refresh_count)
+st.session_state.last_refresh_count = refresh_count
+
 if "tasks" not in st.session_state:
-    st.session_state.tasks = fetch_active_tasks()
+    load_tasks()
     logger.debug("Cached tasks loaded into session_state")  # DEV-LOG
+elif autorefresh_tick:
+    sync_tasks()
+elif "by_id" not in st.session_state:
+    set_tasks(st.session_state.tasks)
+
+titles = [t["title"] for t in st.session_state.tasks]
 
 # ---------- Header ----------
 st.title("🚀 AI Project Assistant")
 st.caption("Conversational updates, manual editing, and weekly reporting")
 
 # ---------- Create / Delete ----------
-with st.sidebar.expander("➕ Create Task", expanded=False):
-    new_title = st.text_input("Title", key="new_title")
-    default_status = st.selectbox("Status", ["To Do", "In Progress", "Done", "Blocked"], key="new_status")
-    default_due = st.date_input("Due Date", value=datetime.now().date(), key="new_due")
-    if st.button("Create", disabled=not IS_ADMIN):
-        try:
-            logger.info(
-                "User %s creating task '%s' (status=%s, due=%s)",
-                USER_ID,
-                new_title,
-                default_status,
-                default_due,
-            )
-            page_id = NOTION_HELPER.create_task(
-                new_title,
-                defaults={"Status": default_status, "Due Date": str(default_due)},
-            )
-            LOGGER.log("create_task", USER_ID, {"title": new_title, "page_id": page_id})
-            logger.info("Task '%s' created with page_id=%s", new_title, page_id)
-            st.success("Created")
-            st.session_state.tasks = fetch_active_tasks()
-            invalidate_task_cache()
-            st.rerun()
-        except Exception as e:
-            logger.exception(
-                "Failed to create task '%s' for user %s", new_title, USER_ID
-            )
-            st.warning(f"Could not create: {e}")
-
-with st.sidebar.expander("🗑️ Delete Task", expanded=False):
-    titles = [t["title"] for t in st.session_state.tasks] or [""]
-    del_sel = st.selectbox("Select", titles)
-    if st.button("Archive", disabled=not IS_ADMIN):
-        try:
-            task = next((t for t in st.session_state.tasks if t["title"] == del_sel), None)
-            if task:
+# Fragments keep widget interactions inside these panels from rerunning the
+# whole app; a full rerun happens only after a successful mutation so the task
+# list and editor pick up the change.
+@st.fragment
+def create_task_panel():
+    with st.expander("➕ Create Task", expanded=False):
+        new_title = st.text_input("Title", key="new_title")
+        default_status = st.selectbox("Status", ["To Do", "In Progress", "Done", "Blocked"], key="new_status")
+        default_due = st.date_input("Due Date", value=TODAY, key="new_due")
+        if st.button("Create", disabled=not IS_ADMIN):
+            try:
                 logger.info(
-                    "User %s archiving task '%s' (page_id=%s)",
+                    "User %s creating task '%s' (status=%s, due=%s)",
                     USER_ID,
-                    del_sel,
-                    task["id"],
+                    new_title,
+                    default_status,
+                    default_due,
+                )
+                page_id = NOTION_HELPER.create_task(
+                    new_title,
+                    defaults={"Status": default_status, "Due Date": str(default_due)},
+                )
+                LOGGER.log("create_task", USER_ID, {"title": new_title, "page_id": page_id})
+                logger.info("Task '%s' created with page_id=%s", new_title, page_id)
+                st.toast("Created")
+                add_task_local(
+                    {
+                        "id": page_id,
+                        "title": new_title,
+                        "status": default_status,
+                        "due_date": str(default_due),
+                        "properties": {},
+                    }
                 )
-                NOTION_HELPER.delete_task(task["id"])
-                LOGGER.log("delete_task", USER_ID, {"title": del_sel, "page_id": task["id"]})
-                logger.info("Task '%s' archived", del_sel)
-                st.success("Archived in Notion")
-                st.session_state.tasks = fetch_active_tasks()
                 invalidate_task_cache()
                 st.rerun()
-        except Exception as e:
-            logger.exception(
-                "Failed to archive task '%s' for user %s", del_sel, USER_ID
-            )
-            st.warning(f"Could not archive: {e}")
+            except Exception as e:
+                logger.exception(
+                    "Failed to create task '%s' for user %s", new_title, USER_ID
+                )
+                st.warning(f"Could not create: {e}")
+
+
+@st.fragment
+def delete_task_panel():
+    with st.expander("🗑️ Delete Task", expanded=False):
+        del_sel = st.selectbox("Select", titles or [""])
+        if st.button("Archive", disabled=not IS_ADMIN):
+            try:
+                task = st.session_state.by_title.get(del_sel)
+                if task:
+                    logger.info(
+                        "User %s archiving task '%s' (page_id=%s)",
+                        USER_ID,
+                        del_sel,
+                        task["id"],
+                    )
+                    NOTION_HELPER.delete_task(task["id"])
+                    LOGGER.log("delete_task", USER_ID, {"title": del_sel, "page_id": task["id"]})
+                    logger.info("Task '%s' archived", del_sel)
+                    st.toast("Archived in Notion")
+                    remove_task_local(task["id"])
+                    invalidate_task_cache()
+                    st.rerun()
+            except Exception as e:
+                logger.exception(
+                    "Failed to archive task '%s' for user %s", del_sel, USER_ID
+                )
+                st.warning(f"Could not archive: {e}")
+
+
+with st.sidebar:
+    create_task_panel()
+    delete_task_panel()
 
 # ---------- Tasks list ----------
+@functools.lru_cache(maxsize=512)
+def _render_task_row(title, status, due, category, phase) -> str:
+    """Format one task-list row as HTML; memoized so unrelated reruns skip the string work."""
+    status_emoji = STATUS_ICONS.get(status, "•")
+    line = [f"Due {due}" if due else None, category, phase]
+    caption = html.escape(" | ".join(filter(None, line)))
+    row = f"<strong>{status_emoji} {html.escape(title)}</strong>"
+    if caption:
+        row += f"<br><small style='opacity:0.7'>{caption}</small>"
+    return f"<li style='padding:6px 0; border-bottom:1px solid rgba(128,128,128,0.25)'>{row}</li>"
+
+
 col_left, col_right = st.columns([1, 2])
 
 with col_left:
     st.subheader("Current Tasks")
+    if "recent_done_count" in st.session_state:
+        st.caption(f"{st.session_state.recent_done_count} completed in the last {RECENT_DONE_DAYS} days")
     if not st.session_state.tasks:
         st.info("No active tasks found")
     else:
-        status_icons = {"To Do": "○", "In Progress": "↻", "Done": "✓", "Blocked": "×"}
-        for t in st.session_state.tasks[:10]:
-            status_emoji = status_icons.get(t.get("status"), "•")
-            st.markdown(f"**{status_emoji} {t['title']}**")
-            line = []
-            if t.get("due_date"): line.append(f"Due {t['due_date']}")
-            if t.get("category"): line.append(f"{t['category']}")
-            if t.get("phase"): line.append(f"{t['phase']}")
-            if line:
-                st.caption(" | ".join(line))
-            st.divider()
+        # One markdown element for the whole list instead of 3 per row
+        rows = "".join(
+            _render_task_row(
+                t["title"],
+                t.get("status"),
+                *(str(t[k]) if t.get(k) else None for k in ("due_date", "category", "phase")),
+            )
+            for t in st.session_state.tasks[:10]
+        )
+        st.markdown(f"<ul style='list-style:none; padding-left:0'>{rows}</ul>", unsafe_allow_html=True)
 
 # ---------- Dynamic editor with autosave toggle ----------
 with col_right:
     st.subheader("Edit Panel")
-    titles = [t["title"] for t in st.session_state.tasks]
     if titles:
         selected = st.selectbox("Pick a task", titles)
-        selected_task = next(t for t in st.session_state.tasks if t["title"] == selected)
+        selected_task = st.session_state.by_title.get(selected)
+        if selected_task is None:
+            # An autosaved title edit renamed the task since the last reindex
+            set_tasks(st.session_state.tasks)
+            selected_task = st.session_state.by_title.get(selected, st.session_state.tasks[0])
 
         if "autosave_enabled" not in st.session_state:
             st.session_state.autosave_enabled = False
@@ -362,132 +691,214 @@ with col_right:
         if changed:
             logger.info("Bulk update saved for task '%s'", selected_task["title"])
             LOGGER.log("bulk_update", USER_ID, {"task": selected_task["title"]})
-            st.session_state.tasks = fetch_active_tasks()
+            # The editor already patched selected_task in place; reindex titles
+            mark_tasks_changed()
+            set_tasks(st.session_state.tasks)
             invalidate_task_cache()
             st.success("Saved changes")
     else:
         st.caption("Nothing to edit")
 
 # ---------- Conversational area ----------
+def _chat_mark_done(match: re.Match) -> str | None:
+    task = st.session_state.by_title_lower.get(match.group("title").strip().lower())
+    if not task:
+        # Unknown title: let Claude resolve it with its fuzzy lookup tool
+        return None
+    logger.info("User %s marking task '%s' as Done via chat", USER_ID, task["title"])
+    NOTION_HELPER.update_task_atomic(task["id"], {"Status": "Done"})
+    LOGGER.log("chat_mark_done", USER_ID, {"task": task["title"], "page_id": task["id"]})
+    # Done tasks leave the active-only list, as they would on a full reload
+    remove_task_local(task["id"])
+    invalidate_task_cache(titles_changed=False)
+    return f"✅ Marked '{task['title']}' as Done in Notion"
+
+
+# Simple intents are answered locally without an Anthropic round-trip.
+# Handlers return None to fall through to the model.
+CHAT_PATTERNS = [
+    (
+        re.compile(r"^\s*mark\s+['\"]?(?P<title>.+?)['\"]?\s+as\s+done\s*[.!]?\s*$", re.I),
+        _chat_mark_done,
+    ),
+]
+
+
+def handle_chat_command(prompt: str) -> str | None:
+    for pattern, handler in CHAT_PATTERNS:
+        match = pattern.match(prompt)
+        if match:
+            return handler(match)
+    return None
+
+
 st.divider()
 st.subheader("Chat Assistant")
 
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {
-            "role": "assistant",
-            "content": "Hi, I can update Notion for you. Try: Mark 'Landing page' as Done.",
-        }
-    ]
-
-for m in st.session_state.messages:
-    if _should_skip_render(m):
-        continue
-    role = m.get("role", "assistant")
-    if role not in {"user", "assistant"}:
-        role = "assistant"
-    rendered = _render_message_content(m.get("content"))
-    if not rendered:
-        continue
-    with st.chat_message(role):
-        st.write(rendered)
-
-if prompt := st.chat_input("Ask me anything..."):
-    with st.chat_message("user"):
-        st.write(prompt)
-
+# Chat runs in its own fragment so sending a message reruns only this panel.
+# Fragment reruns redraw their whole body, so the history is replayed here.
+@st.fragment
+def chat_panel():
     if "messages" not in st.session_state:
-        st.session_state.messages = []
-
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    save_message("user", prompt)
-
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
+        st.session_state.messages = [
+            {
+                "role": "assistant",
+                "content": "Hi, I can update Notion for you. Try: Mark 'Landing page' as Done.",
+            }
+        ]
+
+    for m in st.session_state.messages[-MAX_RENDER:]:
+        if _should_skip_render(m):
+            continue
+        role = m.get("role", "assistant")
+        if role not in {"user", "assistant"}:
+            role = "assistant"
+        rendered = _render_message(m.get("content"))
+        if not rendered:
+            continue
+        with st.chat_message(role):
+            st.write(rendered)
+
+    if prompt := st.chat_input("Ask me anything..."):
+        with st.chat_message("user"):
+            st.write(prompt)
+
+        if "messages" not in st.session_state:
+            st.session_state.messages = []
+
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        save_message("user", prompt)
+        tasks_version = st.session_state.get("tasks_version", 0)
+
+        with st.chat_message("assistant"):
             try:
-                messages = [
-                    {"role": m["role"], "content": m["content"]}
-                    for m in st.session_state.messages[-10:]
-                ]
-
-                task_pages = get_current_tasks_cached()
-                system_prompt = build_system_prompt(task_pages)
-
-                response = ANTHROPIC.messages.create(
-                    model=ANTHROPIC_MODEL,
-                    max_tokens=2048,
-                    system=system_prompt,
-                    tools=TOOLS,
-                    messages=messages,
-                )
-
-                while getattr(response, "stop_reason", None) == "tool_use":
-                    serialized_content = [_serialize_block(block) for block in response.content]
-                    messages.append({"role": "assistant", "content": serialized_content})
-                    st.session_state.messages.append(
-                        {"role": "assistant", "content": serialized_content}
-                    )
-
-                    tool_use = next(
-                        (block for block in serialized_content if block.get("type") == "tool_use"),
-                        None,
-                    )
-
-                    if not tool_use:
-                        break
+                quick_reply = handle_chat_command(prompt)
+            except Exception as e:
+                # The command matched, so answer with the error rather than let
+                # Claude retry the same write
+                logger.exception("Chat command failed")
+                quick_reply = f"❌ Error: {e}"
+            if quick_reply is not None:
+                st.write(quick_reply)
+                st.session_state.messages.append({"role": "assistant", "content": quick_reply})
+                save_message("assistant", quick_reply)
+            else:
+                with st.spinner("Thinking..."):
+                    try:
+                        # stream_claude trims this to the token budget per call
+                        messages = [
+                            {"role": m["role"], "content": m["content"]}
+                            for m in st.session_state.messages
+                        ]
+                        # Date rides on the current prompt so the system prefix stays cacheable
+                        messages[-1] = {
+                            "role": "user",
+                            "content": [{"type": "text", "text": prompt}, date_context()],
+                        }
 
-                    tool_name = tool_use.get("name", "unknown_tool")
-                    tool_input = tool_use.get("input", {}) or {}
-                    st.info(f"🔧 Using tool: {tool_name}")
+                        task_pages = get_current_tasks_cached()
+                        system_prompt = build_system_prompt(task_pages)
 
-                    tool_result = execute_tool(tool_name, tool_input)
+                        response = stream_claude(system_prompt, messages)
+                        context_refresh = None
 
-                    if tool_result.get("success"):
-                        st.success(tool_result["message"])
-                        st.session_state.tasks = fetch_active_tasks()
-                        invalidate_task_cache()
-                    else:
-                        st.warning(tool_result.get("message", "Tool did not return a message"))
+                        while getattr(response, "stop_reason", None) == "tool_use":
+                            serialized_content = [_serialize_block(block) for block in response.content]
+                            messages.append({"role": "assistant", "content": serialized_content})
+                            st.session_state.messages.append(
+                                {"role": "assistant", "content": serialized_content}
+                            )
 
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": [
+                            # Claude may ask for several tools at once; each needs a result
+                            tool_uses = [
                                 {
-                                    "type": "tool_result",
-                                    "tool_use_id": tool_use.get("id"),
-                                    "content": str(tool_result),
+                                    "id": block.get("id"),
+                                    "name": block.get("name", "unknown_tool"),
+                                    "input": block.get("input", {}) or {},
                                 }
-                            ],
-                        }
-                    )
-                    st.session_state.messages.append(messages[-1])
-
-                    response = ANTHROPIC.messages.create(
-                        model=ANTHROPIC_MODEL,
-                        max_tokens=2048,
-                        system=system_prompt,
-                        tools=TOOLS,
-                        messages=messages,
-                    )
+                                for block in serialized_content
+                                if block.get("type") == "tool_use"
+                            ]
+
+                            if not tool_uses:
+                                break
+
+                            for tool_use in tool_uses:
+                                st.info(f"🔧 Using tool: {tool_use['name']}")
+
+                            tool_results = execute_tools(tool_uses)
+
+                            for tool_use, tool_result in zip(tool_uses, tool_results):
+                                tool_name = tool_use["name"]
+                                tool_input = tool_use["input"]
+                                if tool_result.get("success"):
+                                    st.success(tool_result["message"])
+                                    if tool_name in WRITE_TOOLS:
+                                        if tool_name == "update_task_status" and tool_result.get("page_id"):
+                                            new_status = tool_input.get("new_status")
+                                            if NOTION_HELPER.is_active_status(new_status):
+                                                patch_task_local(tool_result["page_id"], {"Status": new_status})
+                                            else:
+                                                remove_task_local(tool_result["page_id"])
+                                        else:
+                                            mark_tasks_changed()
+                                else:
+                                    st.warning(tool_result.get("message", "Tool did not return a message"))
+
+                            if any(
+                                r.get("success") and u["name"] in WRITE_TOOLS
+                                for u, r in zip(tool_uses, tool_results)
+                            ):
+                                invalidate_task_cache(titles_changed=False)
+                                # Re-read the chat context while Claude streams its follow-up
+                                context_refresh = _background_executor().submit(get_current_tasks)
+
+                            messages.append(
+                                {
+                                    "role": "user",
+                                    "content": [
+                                        {
+                                            "type": "tool_result",
+                                            "tool_use_id": tool_use["id"],
+                                            "content": _tool_result_content(tool_result),
+                                        }
+                                        for tool_use, tool_result in zip(tool_uses, tool_results)
+                                    ],
+                                }
+                            )
+                            st.session_state.messages.append(messages[-1])
+
+                            response = stream_claude(system_prompt, messages)
+                            if context_refresh is not None:
+                                store_prefetched_tasks(context_refresh)
+                                context_refresh = None
+
+                        # Only the text is needed here, so skip model_dump on each block
+                        assistant_message = next(
+                            (b.text for b in response.content if getattr(b, "type", None) == "text"),
+                            None,
+                        )
+                        if assistant_message is None:
+                            # Nothing was streamed, show the fallback instead
+                            assistant_message = "I encountered an issue. Please try again."
+                            st.write(assistant_message)
+
+                        st.session_state.messages.append(
+                            {"role": "assistant", "content": assistant_message}
+                        )
+                        save_message("assistant", assistant_message)
+                    except Exception as e:
+                        logger.exception("Anthropic call failed")
+                        st.error(f"Error: {e}")
+
+        # One Supabase insert per chat turn
+        LOGGER.flush_pending()
+        if st.session_state.get("tasks_version", 0) != tasks_version:
+            # The turn changed tasks; refresh the list and editor outside the fragment
+            st.rerun()
 
-                assistant_message = next(
-                    (
-                        block.get("text")
-                        for block in [_serialize_block(b) for b in response.content]
-                        if block.get("type") == "text"
-                    ),
-                    "I encountered an issue. Please try again.",
-                )
 
-                st.write(assistant_message)
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": assistant_message}
-                )
-                save_message("assistant", assistant_message)
-            except Exception as e:
-                logger.exception("Anthropic call failed")
-                st.error(f"Error: {e}")
+chat_panel()
 
 # ---------- Weekly report ----------
 st.divider()
@@ -497,12 +908,14 @@ if st.button("Generate report"):
     logger.info("Weekly report requested by %s for last %d days", USER_ID, range_days)
     try:
         completed = NOTION_HELPER.list_completed_in_range(days=range_days)
-        logger.debug(
-            "Weekly report source tasks: %s",
-            [t.get("title") for t in completed],
-        )  # DEV-LOG
-        report = ASSIST_OPS.weekly_report(completed)
-        title = f"Weekly Report, generated {datetime.utcnow().strftime('%Y-%m-%d')}"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Weekly report source tasks: %s",
+                [t.get("title") for t in completed],
+            )  # DEV-LOG
+        # Render the report while it streams; the full text is returned for Notion
+        report = st.write_stream(ASSIST_OPS.stream_weekly_report(completed)).strip()
+        title = f"Weekly Report, generated {NOW.strftime(_TODAY_FMT)}"
         NOTION_HELPER.create_task(title, defaults={"Notes or Description": report, "Status": "Done"})
         LOGGER.log("weekly_report", USER_ID, {"items": len(completed)})
         logger.info(
@@ -513,3 +926,8 @@ if st.button("Generate report"):
     except Exception as e:
         logger.exception("Failed to generate weekly report for user %s", USER_ID)
         st.warning(f"Could not generate report: {e}")
+
+# ---------- Flush event log ----------
+# Events from this run go out as one batch; runs that end in st.rerun()/st.stop()
+# are picked up by the flush at the top of the next run.
+LOGGER.flush_pending()
@@ -1,48 +1,63 @@
-from typing import List, Dict, Any
-from anthropic import Anthropic
+from typing import TYPE_CHECKING, Iterator, List, Dict, Any
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from anthropic import Anthropic
+
+SUMMARY_SYSTEM = (
+    "You summarize completed project tasks. "
+    "Write a concise 2 to 3 sentence summary of what was accomplished, practical and specific."
+)
+REPORT_SYSTEM = (
+    "Create a clear weekly progress report for a product owner.\n"
+    "Keep it under 250 words. Use bullet points."
+)
+# Lets the model stop at a natural break instead of padding to max_tokens
+STOP_SEQUENCES = ["\n\n\n"]
+
+
+def _cached_system(text: str) -> List[Dict[str, Any]]:
+    # Static instructions go in a cached system block; only task data varies per call
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+def _text_of(msg) -> str:
+    return "\n".join(b.text for b in msg.content if getattr(b, "type", None) == "text").strip()
+
+
 class AssistantOps:
-    def __init__(self, anthropic: Anthropic):
+    def __init__(self, anthropic: "Anthropic"):
         self.anthropic = anthropic
         self.model = "claude-sonnet-4-5-20250929"
 
     def summarize_completion(self, task_title: str, notes: str) -> str:
         prompt = (
             f"Task completed: {task_title}\n"
-            f"Notes or context: {notes}\n\n"
-            "Write a concise 2 to 3 sentence summary of what was accomplished, practical and specific."
+            f"Notes or context: {notes}"
         )
         msg = self.anthropic.messages.create(
             model=self.model,
-            max_tokens=256,
+            max_tokens=160,
+            system=_cached_system(SUMMARY_SYSTEM),
+            stop_sequences=STOP_SEQUENCES,
             messages=[{"role": "user", "content": prompt}],
         )
-        # Extract text blocks
-        out = []
-        for b in msg.content:
-            if hasattr(b, "text"):
-                out.append(b.text)
-        return "\n".join(out).strip()
+        return _text_of(msg)
 
-    def weekly_report(self, completed: List[Dict[str, Any]]) -> str:
-        items = []
-        for t in completed:
-            line = f"- {t.get('title')} [Done, due {t.get('due_date') or 'n/a'}]"
-            items.append(line)
-        body = "\n".join(items) if items else "- No completed items in the period"
-        prompt = (
-            "Create a clear weekly progress report for a product owner.\n"
-            "Keep it under 250 words. Use bullet points.\n\n"
-            f"Completed items last week:\n{body}"
-        )
-        msg = self.anthropic.messages.create(
+    def stream_weekly_report(self, completed: List[Dict[str, Any]]) -> Iterator[str]:
+        """Yield the report text as it is generated, e.g. for ``st.write_stream``."""
+        body = "\n".join(
+            f"- {t.get('title')} [Done, due {t.get('due_date') or 'n/a'}]" for t in completed
+        ) or "- No completed items in the period"
+        prompt = f"Completed items last week:\n{body}"
+        with self.anthropic.messages.stream(
             model=self.model,
             max_tokens=512,
+            system=_cached_system(REPORT_SYSTEM),
+            stop_sequences=STOP_SEQUENCES,
             messages=[{"role": "user", "content": prompt}],
-        )
-        out = []
-        for b in msg.content:
-            if hasattr(b, "text"):
-                out.append(b.text)
-        return "\n".join(out).strip()
+        ) as stream:
+            yield from stream.text_stream
+
+    def weekly_report(self, completed: List[Dict[str, Any]]) -> str:
+        return "".join(self.stream_weekly_report(completed)).strip()
@@ -1,10 +1,18 @@
+import difflib
+import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
 import streamlit as st
-from notion_client import Client
+
+from .notion_utils import append_note_block, throttled
+
+if TYPE_CHECKING:
+    from notion_client import Client
 
 logger = logging.getLogger("project_assistant.tools")
 
@@ -18,104 +26,94 @@ except FileNotFoundError:
         "AI-powered B2B sales training product."
     )
 
-TOOLS = [
-    {
-        "name": "update_task_status",
-        "description": "Update the status of a task in Notion. Use this when the user reports completing a task or changing its status.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "task_title": {
-                    "type": "string",
-                    "description": "The title/name of the task to update",
-                },
-                "new_status": {
-                    "type": "string",
-                    "enum": ["To Do", "In Progress", "Done", "Blocked"],
-                    "description": "The new status for the task",
-                },
-            },
-            "required": ["task_title", "new_status"],
-        },
-    },
-    {
-        "name": "add_task_notes",
-        "description": "Add notes or learnings to a task in Notion. Use this when the user shares insights or progress details.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "task_title": {
-                    "type": "string",
-                    "description": "The title/name of the task",
-                },
-                "notes": {
-                    "type": "string",
-                    "description": "The notes to add",
-                },
-            },
-            "required": ["task_title", "notes"],
-        },
-    },
-]
+# Week 1 of the 52-week plan starts here (server-local midnight)
+START_DATE = datetime(2025, 11, 3)
+START_EPOCH = START_DATE.timestamp()
+_SECONDS_PER_WEEK = 7 * 24 * 60 * 60
+
+_TITLE_KEYS = frozenset({"Task", "Title", "Name"})
 
 
 def _get_title(props: Dict[str, Any]) -> str:
-    candidates = ["Task", "Title", "Name"]
-    for key in candidates:
-        title_prop = props.get(key) or {}
-        title_items = title_prop.get("title") or []
-        if title_items:
-            return title_items[0].get("plain_text") or "Untitled"
-
-    for prop in props.values():
-        if prop.get("type") == "title":
-            items = prop.get("title") or []
+    # A Notion database has exactly one title property, so the first hit wins
+    for key, prop in props.items():
+        if key in _TITLE_KEYS or prop.get("type") == "title":
+            items = prop.get("title")
             if items:
-                return items[0].get("plain_text") or "Untitled"
+                text = items[0].get("plain_text")
+                if text:
+                    return text
     return "Untitled"
 
 
-def build_system_prompt(current_tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Render a dynamic system prompt with current Notion context."""
-    task_lines: List[str] = []
-    for task in current_tasks or []:
-        props = task.get("properties", {})
-        title = _get_title(props)
-        status = (
-            props.get("Status", {})
-            .get("status", {})
-            .get("name", "Unknown")
-        )
-        due_date = (
-            props.get("Due Date", {})
-            .get("date", {})
-            .get("start", "No date")
-        )
-        category = (
-            props.get("Category", {})
-            .get("select", {})
-            .get("name", "Uncategorized")
-        )
-        week = props.get("Week", {}).get("number")
-        week_display = week if week is not None else "?"
-        task_lines.append(
-            f"- **{title}** | Status: {status} | Due: {due_date} | Category: {category} | Week: {week_display}"
-        )
+def _task_fields(task: Dict[str, Any]) -> tuple:
+    props = task.get("properties", {})
+    # Empty Notion properties come back as null, not missing
+    status = ((props.get("Status") or {}).get("status") or {}).get("name", "Unknown")
+    due_date = ((props.get("Due Date") or {}).get("date") or {}).get("start")
+    category = ((props.get("Category") or {}).get("select") or {}).get("name", "Uncategorized")
+    week = (props.get("Week") or {}).get("number")
+    return _get_title(props), status, due_date, category, week
+
+
+def _task_line(fields: tuple) -> str:
+    title, status, due_date, category, week = fields
+    week_display = week if week is not None else "?"
+    return (
+        f"- **{title}** | Status: {status} | Due: {due_date or 'No date'} "
+        f"| Category: {category} | Week: {week_display}"
+    )
 
+
+# Rendered task lists keyed on the current week plus (id, last_edited_time) of every task
+_TASKS_TEXT_CACHE: Dict[tuple, str] = {}
+_TASKS_TEXT_CACHE_MAX = 16
+# Open tasks listed individually in the prompt; the rest are only counted
+MAX_PROMPT_TASKS = 30
+
+
+def _render_tasks_text(current_tasks: List[Dict[str, Any]], current_week: int) -> str:
+    # Sorted by id first so ties rank the same way every time and the same
+    # task set renders byte-identical text for Claude's prompt cache
+    tasks = sorted(current_tasks or [], key=lambda t: t.get("id", ""))
+    fingerprint = (current_week,) + tuple((t.get("id"), t.get("last_edited_time")) for t in tasks)
+    cached = _TASKS_TEXT_CACHE.get(fingerprint)
+    if cached is not None:
+        return cached
+
+    fields = [_task_fields(task) for task in tasks]
+    open_tasks = [f for f in fields if f[1] != "Done"]
+    done_count = len(fields) - len(open_tasks)
+    # This week's tasks first, then by due date with undated tasks last
+    open_tasks.sort(key=lambda f: (f[4] != current_week, f[2] is None, f[2] or ""))
+    dropped = len(open_tasks) - MAX_PROMPT_TASKS
+    if dropped > 0:
+        logger.info("System prompt lists %d of %d open tasks", MAX_PROMPT_TASKS, len(open_tasks))
+        open_tasks = open_tasks[:MAX_PROMPT_TASKS]
+
+    task_lines = [_task_line(f) for f in open_tasks]
+    if dropped > 0:
+        task_lines.append(f"- {dropped} more open tasks (omitted for brevity)")
+    if done_count:
+        task_lines.append(f"- {done_count} tasks completed (titles omitted for brevity)")
     tasks_text = "\n".join(task_lines) if task_lines else "No active tasks found"
+    if len(_TASKS_TEXT_CACHE) >= _TASKS_TEXT_CACHE_MAX:
+        _TASKS_TEXT_CACHE.clear()
+    _TASKS_TEXT_CACHE[fingerprint] = tasks_text
+    return tasks_text
 
-    start_date = datetime(2025, 11, 3)
-    now = datetime.now()
-    current_week = max(1, min(52, ((now - start_date).days // 7) + 1))
 
-    dynamic_context = f"""**CURRENT CONTEXT:**
+def build_system_prompt(current_tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Render a dynamic system prompt with current Notion context."""
+    current_week = max(1, min(52, int((time.time() - START_EPOCH) // _SECONDS_PER_WEEK) + 1))
+    tasks_text = _render_tasks_text(current_tasks, current_week)
+
+    # Ordered most to least stable so each cache prefix ends before volatile text.
+    # The date is left out entirely; see date_context().
+    timeline_context = f"""**CURRENT CONTEXT:**
 - **Week {current_week}** of 52-week timeline
 - **Phase:** Phase 0: Validation and Architecture (Weeks 1-8)
 - **Constraint:** 12 hours/week available
-- **Today's Date:** {now.strftime("%Y-%m-%d")}
-
-**ACTIVE TASKS IN NOTION:**
-{tasks_text}
 """
 
     return [
@@ -126,40 +124,123 @@ def build_system_prompt(current_tasks: List[Dict[str, Any]]) -> List[Dict[str, A
         },
         {
             "type": "text",
-            "text": dynamic_context,
+            "text": f"**ACTIVE TASKS IN NOTION:**\n{tasks_text}\n",
+            "cache_control": {"type": "ephemeral"},
+        },
+        {
+            "type": "text",
+            "text": timeline_context,
         },
     ]
 
 
-def find_task_by_title(notion: Client, database_id: str, task_title: str) -> str | None:
-    """Find a task in Notion by its title (fuzzy match)."""
+def date_context() -> Dict[str, Any]:
+    """Today's date as a user-message block, kept out of the cached system prompt."""
+    return {"type": "text", "text": f"(Today's Date: {datetime.now().strftime('%Y-%m-%d')})"}
+
+
+# Minimum difflib ratio for the local fuzzy fallback
+FUZZY_CUTOFF = 0.7
+
+
+def _query_title(notion: "Client", database_id: str, condition: Dict[str, str]) -> List[Dict[str, Any]]:
+    response: Dict[str, Any] = throttled(
+        notion.databases.query,
+        database_id=database_id,
+        filter={"property": "Task", "title": condition},
+    )
+    return response.get("results") or []
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _task_title_index(_notion: "Client", database_id: str) -> List[tuple]:
+    """One page of (lowercased title, page id) pairs for local fuzzy matching."""
+    response: Dict[str, Any] = throttled(_notion.databases.query, database_id=database_id, page_size=100)
+    return [(_get_title(r.get("properties", {})).lower(), r["id"]) for r in response.get("results") or []]
+
+
+def _best_match(task_title: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pick the result whose title is closest to what was asked for."""
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    # SequenceMatcher caches its analysis of seq2, so the query is set once
+    matcher.set_seq2(task_title.lower())
+    best, best_score = results[0], -1.0
+    for result in results:
+        matcher.set_seq1(_get_title(result.get("properties", {})).lower())
+        score = matcher.ratio()
+        if score > best_score:
+            best, best_score = result, score
+    return best
+
+
+class _TaskNotFound(LookupError):
+    """Raised on a lookup miss so cache_data keeps only hits."""
+
+
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def _lookup_task_id(_notion: "Client", database_id: str, task_title: str) -> str:
+    # Exact title first, then substring, then a local fuzzy match so near-misses
+    # don't need another round-trip per guess. A miss raises instead of
+    # returning None: a task created right after it must not read as missing
+    # for the rest of the TTL.
+    results = _query_title(_notion, database_id, {"equals": task_title})
+    if not results:
+        results = _query_title(_notion, database_id, {"contains": task_title})
+    if len(results) > 1:
+        return _best_match(task_title, results).get("id")
+    if results:
+        return results[0].get("id")
+
+    index = _task_title_index(_notion, database_id)
+    match = difflib.get_close_matches(task_title.lower(), [t for t, _ in index], n=1, cutoff=FUZZY_CUTOFF)
+    if not match:
+        raise _TaskNotFound(task_title)
+    return next(page_id for title, page_id in index if title == match[0])
+
+
+def clear_task_lookup_cache() -> None:
+    """Drop cached title lookups; call when tasks are created, deleted or renamed."""
+    _lookup_task_id.clear()
+    _task_title_index.clear()
+
+
+def find_task_by_title(notion: "Client", database_id: str, task_title: str) -> str | None:
+    """Find a task in Notion by its title (fuzzy match).
+
+    Returns None when nothing matches; Notion errors are raised so the tool
+    can report them in its result (tools may run off the script thread,
+    where st.* calls are dropped).
+    """
+    # Status and notes edits never change a page id, so lookups stay valid for the TTL
     try:
-        response: Dict[str, Any] = notion.databases.query(
-            database_id=database_id,
-            filter={
-                "property": "Task",
-                "rich_text": {
-                    "contains": task_title,
-                },
-            },
-        )
-        task_id = response.get("results", [{}])[0].get("id") if response.get("results") else None
-        logger.debug("find_task_by_title('%s') -> %s", task_title, task_id)
-        return task_id
+        task_id = _lookup_task_id(notion, database_id, task_title)
+    except _TaskNotFound:
+        task_id = None
+    logger.debug("find_task_by_title('%s') -> %s", task_title, task_id)
+    return task_id
+
+
+def _resolve_task_id(notion: "Client", database_id: str, task_title: str) -> tuple[str | None, dict | None]:
+    """Return (task_id, None), or (None, failed tool result)."""
+    try:
+        task_id = find_task_by_title(notion, database_id, task_title)
     except Exception as exc:  # noqa: BLE001
         logger.exception("Error finding task '%s'", task_title)
-        st.error(f"Error finding task: {exc}")
-        return None
+        return None, {"success": False, "message": f"Error finding task: {exc}"}
+    if not task_id:
+        return None, {"success": False, "message": f"Could not find task: {task_title}"}
+    return task_id, None
 
 
-def update_task_status(notion: Client, database_id: str, task_title: str, new_status: str) -> dict:
+def update_task_status(notion: "Client", database_id: str, task_title: str, new_status: str) -> dict:
     """Update a task's status in Notion."""
-    task_id = find_task_by_title(notion, database_id, task_title)
-    if not task_id:
-        return {"success": False, "message": f"Could not find task: {task_title}"}
+    task_id, error = _resolve_task_id(notion, database_id, task_title)
+    if error:
+        return error
 
     try:
-        notion.pages.update(
+        throttled(
+            notion.pages.update,
             page_id=task_id,
             properties={
                 "Status": {
@@ -170,31 +251,23 @@ def update_task_status(notion: Client, database_id: str, task_title: str, new_st
             },
         )
         logger.info("Updated task '%s' status to %s (page_id=%s)", task_title, new_status, task_id)
-        return {"success": True, "message": f"Updated '{task_title}' to {new_status}"}
+        # page_id lets the caller patch the task the fuzzy lookup resolved to
+        return {"success": True, "message": f"Updated '{task_title}' to {new_status}", "page_id": task_id}
     except Exception as exc:  # noqa: BLE001
         logger.exception("Error updating task '%s'", task_title)
         return {"success": False, "message": f"Error updating task: {exc}"}
 
 
-def add_task_notes(notion: Client, database_id: str, task_title: str, notes: str) -> dict:
+def add_task_notes(notion: "Client", database_id: str, task_title: str, notes: str) -> dict:
     """Add notes to a task in Notion."""
-    task_id = find_task_by_title(notion, database_id, task_title)
-    if not task_id:
-        return {"success": False, "message": f"Could not find task: {task_title}"}
+    task_id, error = _resolve_task_id(notion, database_id, task_title)
+    if error:
+        return error
 
     try:
-        page = notion.pages.retrieve(page_id=task_id)
-        existing_notes = page["properties"].get("Notes", {}).get("rich_text", [])
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        new_note_text = f"\n\n[{timestamp}] {notes}"
-        notion.pages.update(
-            page_id=task_id,
-            properties={
-                "Notes": {
-                    "rich_text": existing_notes + [{"text": {"content": new_note_text}}],
-                },
-            },
-        )
+        # Append a paragraph to the page body: one round-trip, and no rewrite of
+        # an ever-growing rich_text property
+        append_note_block(notion, task_id, notes)
         logger.info("Added notes to task '%s' (page_id=%s)", task_title, task_id)
         return {"success": True, "message": f"Added notes to '{task_title}'"}
     except Exception as exc:  # noqa: BLE001
@@ -202,7 +275,13 @@ def add_task_notes(notion: Client, database_id: str, task_title: str, notes: str
         return {"success": False, "message": f"Error adding notes: {exc}"}
 
 
-def execute_tool(tool_name: str, tool_input: dict, notion: Client, database_id: str) -> dict:
+# Identity of a tool call; execute_tools uses it to collapse identical calls
+# within one turn (nothing is kept across turns)
+def _tool_key(tool_name: str, tool_input: dict) -> tuple:
+    return tool_name, json.dumps(tool_input, sort_keys=True, default=str)
+
+
+def execute_tool(tool_name: str, tool_input: dict, notion: "Client", database_id: str) -> dict:
     """Execute the requested tool."""
     if tool_name == "update_task_status":
         return update_task_status(
@@ -220,3 +299,52 @@ def execute_tool(tool_name: str, tool_input: dict, notion: Client, database_id:
         )
     logger.warning("Unknown tool requested: %s", tool_name)
     return {"success": False, "message": "Unknown tool"}
+
+
+def _prefetch_task_id(notion: "Client", database_id: str, task_title: str) -> str | None:
+    try:
+        return _lookup_task_id(notion, database_id, task_title)
+    except Exception:  # noqa: BLE001
+        # The tool call repeats the lookup and reports the error itself
+        return None
+
+
+def execute_tools(tool_calls: List[Dict[str, Any]], notion: "Client", database_id: str) -> List[dict]:
+    """Execute a turn's tool calls, overlapping their Notion round-trips.
+
+    Identical calls within the turn run once, in the position of their last
+    occurrence. Each distinct title is looked up once up front, then calls are
+    grouped by the task they resolve to: a group runs in call order so the
+    last write Claude issued is the one Notion keeps, and only separate tasks
+    run concurrently. Results are returned in call order.
+    """
+    unique: Dict[tuple, Dict[str, Any]] = {}
+    for c in tool_calls:
+        key = _tool_key(c["name"], c["input"])
+        unique.pop(key, None)
+        unique[key] = c
+    calls = list(unique.values())
+
+    def run_in_order(group: List[Dict[str, Any]]) -> List[dict]:
+        return [execute_tool(c["name"], c["input"], notion, database_id) for c in group]
+
+    if len(calls) <= 1:
+        groups = [calls]
+        grouped = [run_in_order(calls)]
+    else:
+        titles = [t for t in dict.fromkeys(c["input"].get("task_title") for c in calls) if t is not None]
+        with ThreadPoolExecutor(max_workers=min(4, len(calls)), thread_name_prefix="tools") as pool:
+            resolved = pool.map(lambda title: _prefetch_task_id(notion, database_id, title), titles)
+            page_ids = dict(zip(titles, resolved))
+            by_task: Dict[Any, List[Dict[str, Any]]] = {}
+            for c in calls:
+                title = c["input"].get("task_title")
+                by_task.setdefault(page_ids.get(title) or title, []).append(c)
+            groups = list(by_task.values())
+            grouped = list(pool.map(run_in_order, groups))
+    by_key = {
+        _tool_key(c["name"], c["input"]): result
+        for group, results in zip(groups, grouped)
+        for c, result in zip(group, results)
+    }
+    return [by_key[_tool_key(c["name"], c["input"])] for c in tool_calls]
@@ -1,27 +1,111 @@
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
+import queue
+import threading
+import time
+
+LOG_TABLE = "project_logs"
+BATCH_SIZE = 20
+FLUSH_INTERVAL_SECONDS = 2.0
+
+# Supabase writes happen on one daemon thread so they never block a rerun
+_WRITE_QUEUE: "queue.Queue[tuple[EventLogger, List[Dict[str, Any]]]]" = queue.Queue()
+_writer_lock = threading.Lock()
+_writer: Optional[threading.Thread] = None
+
+
+# (epoch second, ISO string) reused for events logged within the same second
+_last_stamp: tuple[int, str] = (-1, "")
+
+
+def _timestamp() -> str:
+    global _last_stamp
+    sec = time.time_ns() // 1_000_000_000
+    if _last_stamp[0] != sec:
+        stamp = datetime.fromtimestamp(sec, timezone.utc).isoformat(timespec="seconds")
+        _last_stamp = (sec, stamp)
+    return _last_stamp[1]
+
+
+def _drain_writes():
+    while True:
+        event_logger, records = _WRITE_QUEUE.get()
+        try:
+            event_logger.log_many(records)
+        except Exception:
+            pass
+        finally:
+            _WRITE_QUEUE.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_drain_writes, name="event-logger", daemon=True)
+            _writer.start()
+
 
 class EventLogger:
-    """Thin wrapper that logs to memory, and to Supabase if available."""
-    def __init__(self, supabase_client=None):
+    """Thin wrapper that logs to memory, and to Supabase if available.
+
+    Events are queued in ``pending`` and written to Supabase in a single
+    bulk insert once ``BATCH_SIZE`` is reached, ``FLUSH_INTERVAL_SECONDS`` have
+    passed, or ``flush_pending`` is called. The insert itself runs on a
+    background thread; ``flush`` writes synchronously instead.
+    Pass a list that outlives the logger (e.g. one held in session_state) so
+    queued events survive Streamlit reruns.
+    """
+    def __init__(self, supabase_client=None, pending: Optional[List[Dict[str, Any]]] = None):
         self.supabase = supabase_client
         self.buffer = []
+        self.pending = pending if pending is not None else []
+        self._errors = 0
+        self._last_flush = time.monotonic()
 
     def log(self, event: str, user_id: str, meta: Optional[Dict[str, Any]] = None):
         record = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _timestamp(),
             "event": event,
             "user_id": user_id,
             "meta": meta or {},
         }
         self.buffer.append(record)
+        self.pending.append(record)
+        if len(self.pending) >= BATCH_SIZE or time.monotonic() - self._last_flush > FLUSH_INTERVAL_SECONDS:
+            self.flush_pending()
+
+    def log_many(self, records: List[Dict[str, Any]]):
         # Optional Supabase table: project_logs with columns: timestamp, event, user_id, meta (json)
+        if self.supabase is None or not records:
+            return
         try:
-            if self.supabase is not None:
-                self.supabase.table("project_logs").insert(record).execute()
-        except Exception as e:
-            # Do not crash the UI for logging issues
-            self.buffer.append({"error": str(e)})
+            self.supabase.table(LOG_TABLE).insert(records).execute()
+        except Exception:
+            # Fall back to row-by-row so one bad record doesn't drop the batch
+            for record in records:
+                try:
+                    self.supabase.table(LOG_TABLE).insert(record).execute()
+                except Exception:
+                    # Do not crash the UI for logging issues
+                    self._errors += 1
+
+    def _take_pending(self) -> List[Dict[str, Any]]:
+        records = list(self.pending)
+        self.pending.clear()
+        self._last_flush = time.monotonic()
+        return records
+
+    def flush_pending(self):
+        if not self.pending:
+            return
+        records = self._take_pending()
+        if self.supabase is None:
+            return
+        _ensure_writer()
+        _WRITE_QUEUE.put((self, records))
 
     def flush(self):
-        self.buffer.clear()
+        """Write any queued events now, on the calling thread."""
+        if self.pending:
+            self.log_many(self._take_pending())
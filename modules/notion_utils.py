@@ -1,22 +1,133 @@
-from typing import Dict, Any, List, Optional
-from notion_client import Client
-from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterator, List, NamedTuple, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import httpx  # make sure it's in requirements.txt
 
+if TYPE_CHECKING:
+    from notion_client import Client
+
+logger = logging.getLogger("project_assistant.notion")
+
+NOTION_API_URL = "https://api.notion.com/v1"
+SCHEMA_MAX_AGE_SECONDS = 60
+TASK_CACHE_MAX = 5000
 TITLE_PROPERTY = "Title"
 NOTES_PROPERTY_NAMES = {"Notes or Description", "Notes"}
 
 
-def _slugify(name: str) -> str:
-    return "_".join(name.lower().split())
+# Property names are few and fixed per schema, so slugs are memoised
+_slug_cache: Dict[str, str] = {}
+
+
+def slugify(name: str) -> str:
+    """Task dict key for a property name; the app, editor and loader all use this."""
+    slug = _slug_cache.get(name)
+    if slug is None:
+        slug = _slug_cache[name] = "_".join(name.lower().split())
+    return slug
+
+
+def _note_timestamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
 
 
 def _rich_text_to_plain(items: List[Dict[str, Any]]) -> Optional[str]:
     if not items:
         return None
-    text = "".join(part.get("plain_text") or "" for part in items).strip()
+    if len(items) == 1:
+        text = (items[0].get("plain_text") or "").strip()
+    else:
+        text = "".join(part.get("plain_text") or "" for part in items).strip()
     return text or None
 
+class TokenBucket:
+    """Blocking token bucket shared by every Notion call in the process."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Notion allows an average of 3 requests/s per integration; stay just under it
+_BUCKET = TokenBucket(rate=2.5, capacity=3)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds to wait if ``exc`` is a 429 from the SDK or httpx, else None."""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def throttled(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call ``fn`` under the process-wide Notion rate limit.
+
+    Every Notion request, whether it goes through NotionHelper or the raw
+    client, should pass through here. One retry after a 429, honouring
+    Retry-After.
+    """
+    _BUCKET.acquire()
+    try:
+        return fn(*args, **kwargs)
+    except Exception as exc:
+        delay = _retry_after(exc)
+        if delay is None:
+            raise
+        time.sleep(delay)
+        _BUCKET.acquire()
+        return fn(*args, **kwargs)
+
+
+def _rate_limited(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return throttled(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def append_note_block(client: "Client", page_id: str, text: str) -> None:
+    """Append a timestamped note to a page body as one paragraph block."""
+    entry = f"[{_note_timestamp()}] {text}"
+    throttled(
+        client.blocks.children.append,
+        block_id=page_id,
+        children=[
+            {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": [{"text": {"content": entry[:2000]}}]},
+            }
+        ],
+    )
+
+
 ACTIVE_STATUS_FALLBACKS = [
     "Not started",
     "In progress",
@@ -28,14 +139,56 @@ ACTIVE_STATUS_FALLBACKS = [
 COMPLETE_GROUP_NAMES = {"complete", "completed", "done"}
 
 
+class TaskBundle(NamedTuple):
+    schema: Dict[str, Any]
+    active: List[Dict[str, Any]]
+    completed: Optional[List[Dict[str, Any]]]
+
+
 class NotionHelper:
-    def __init__(self, client: Client, database_id: str, notion_token: str):
+    def __init__(self, client: "Client", database_id: str, notion_token: str):
         self.client = client
         self.database_id = database_id
         self.notion_token = notion_token  # used by HTTP fallback
         self._schema_cache: Optional[Dict[str, Any]] = None
+        self._schema_fetched_at = 0.0
+        self._schema_lock = threading.Lock()
+        self._schema_refreshing = False
+        self._http_client: Optional[httpx.Client] = None
+        # Derived from the schema. Each entry is (schema it was built from, value),
+        # so swapping in a new schema invalidates them without extra locking.
+        self._active_names_cache: Optional[tuple[Dict[str, Any], List[str]]] = None
+        self._active_query_cache: Optional[tuple[Dict[str, Any], Dict[str, Any], List[str]]] = None
+        # (name, extractor, slug, is_title, is_notes) per schema property
+        self._schema_index: Optional[tuple[Dict[str, Any], List[tuple]]] = None
+        # page_id -> (last_edited_time, schema, task), oldest first
+        self._task_cache: "OrderedDict[str, tuple[str, Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+        self._task_cache_lock = threading.Lock()
+
+    @property
+    def _http(self) -> httpx.Client:
+        # Created on first fallback use; kept so later fallbacks reuse the connection
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                base_url=NOTION_API_URL,
+                headers={
+                    "Authorization": f"Bearer {self.notion_token}",
+                    # Any current Notion-Version works for simple queries. This one is stable.
+                    "Notion-Version": "2022-06-28",
+                    "Content-Type": "application/json",
+                },
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+            )
+        return self._http_client
+
+    def close(self) -> None:
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
 
     # ---------- SDK + HTTP fallback ----------
+    @_rate_limited
     def _query_db(self, **kwargs) -> Dict[str, Any]:
         """
         Prefer notion-client's databases.query(...).
@@ -50,78 +203,142 @@ class NotionHelper:
                 return sdk_query(**kwargs)
 
         # Fallback: raw HTTP call to Notion REST API
-        url = f"https://api.notion.com/v1/databases/{kwargs['database_id']}/query"
         # Remove database_id from JSON payload for the REST body
+        # (already inside @_rate_limited, so a 429 raised here is retried)
         body = {k: v for k, v in kwargs.items() if k != "database_id"}
-        headers = {
-            "Authorization": f"Bearer {self.notion_token}",
-            # Any current Notion-Version works for simple queries. This one is stable.
-            "Notion-Version": "2022-06-28",
-            "Content-Type": "application/json",
-        }
-        with httpx.Client(timeout=30.0) as http:
-            r = http.post(url, headers=headers, json=body)
-            r.raise_for_status()
-            return r.json()
+        return self._http_json("POST", f"/databases/{kwargs['database_id']}/query", json=body)
+
+    def _http_json(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """
+        Raw REST call that raises on HTTP errors. Run it inside throttled() so
+        status checks happen within the retry and a 429 honours Retry-After.
+        """
+        r = self._http.request(method, path, **kwargs)
+        r.raise_for_status()
+        return r.json()
+
+    def _iter_query_db(self, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield each page of results for a query, following cursors to the end.
+        The next page is requested as soon as its cursor is known, so it is in
+        flight while the caller handles the current one.
+        """
+        kwargs.setdefault("page_size", 100)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            resp = self._query_db(**kwargs)
+            while True:
+                next_page = None
+                if resp.get("has_more") and resp.get("next_cursor"):
+                    next_page = pool.submit(self._query_db, **kwargs, start_cursor=resp["next_cursor"])
+                yield resp.get("results", [])
+                if next_page is None:
+                    return
+                resp = next_page.result()
+
+    def _query_db_all(self, **kwargs) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        for chunk in self._iter_query_db(**kwargs):
+            results.extend(chunk)
+        return results
 
     # ---------- Schema ----------
     def _fetch_schema_via_sdk(self) -> Dict[str, Any]:
         try:
-            db = self.client.databases.retrieve(self.database_id)
+            db = throttled(self.client.databases.retrieve, self.database_id)
             return db.get("properties", {}) or {}
         except Exception:
             return {}
 
     def _fetch_schema_via_http(self) -> Dict[str, Any]:
-        url = f"https://api.notion.com/v1/databases/{self.database_id}"
-        headers = {
-            "Authorization": f"Bearer {self.notion_token}",
-            "Notion-Version": "2022-06-28",
-            "Content-Type": "application/json",
-        }
         try:
-            with httpx.Client(timeout=30.0) as http:
-                r = http.get(url, headers=headers)
-                r.raise_for_status()
-                data = r.json()
-                return data.get("properties", {}) or {}
+            data = throttled(self._http_json, "GET", f"/databases/{self.database_id}")
+            return data.get("properties", {}) or {}
         except Exception:
             return {}
 
-    def schema(self) -> Dict[str, Any]:
-        if self._schema_cache is not None:
-            return self._schema_cache
-
+    def _fetch_schema(self) -> Dict[str, Any]:
         props = self._fetch_schema_via_sdk()
         if not props:
             props = self._fetch_schema_via_http()
+        return props or {}
 
-        self._schema_cache = props or {}
+    def schema(self) -> Dict[str, Any]:
+        """
+        Return the cached schema. Once it is older than SCHEMA_MAX_AGE_SECONDS
+        the stale copy is still returned, and a single background refresh
+        replaces it.
+        """
+        if self._schema_cache is None:
+            self._schema_cache = self._fetch_schema()
+            self._schema_fetched_at = time.monotonic()
+        elif time.monotonic() - self._schema_fetched_at > SCHEMA_MAX_AGE_SECONDS:
+            with self._schema_lock:
+                start = not self._schema_refreshing
+                self._schema_refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_into_cache, name="notion-schema", daemon=True).start()
         return self._schema_cache
 
-    def refresh_schema(self):
+    def _refresh_into_cache(self) -> None:
+        try:
+            props = self._fetch_schema()
+            # Derived caches are keyed on the schema object, so an unchanged
+            # schema keeps the old one; only a real change swaps the reference
+            if props and props != self._schema_cache:
+                self._schema_cache = props
+            self._schema_fetched_at = time.monotonic()
+        finally:
+            with self._schema_lock:
+                self._schema_refreshing = False
+
+    def _clear_schema_cache(self) -> None:
         self._schema_cache = None
+
+    def _indexed_schema(self) -> List[tuple]:
+        schema = self.schema()
+        cached = self._schema_index
+        if cached is None or cached[0] is not schema:
+            index = [
+                (
+                    name,
+                    _EXTRACTORS.get(prop_schema.get("type")),
+                    slugify(name),
+                    prop_schema.get("type") == "title",
+                    name in NOTES_PROPERTY_NAMES,
+                )
+                for name, prop_schema in schema.items()
+            ]
+            cached = self._schema_index = (schema, index)
+        return cached[1]
+
+    def refresh_schema(self):
+        self._clear_schema_cache()
         return self.schema()
 
     # ---------- Fetch ----------
     def _active_tasks_query(self) -> tuple[Dict[str, Any], List[str]]:
-        active_statuses = self._active_status_names()
-        query_kwargs: Dict[str, Any] = {
-            "database_id": self.database_id,
-            "sorts": [{"property": "Due Date", "direction": "ascending"}],
-        }
-        if active_statuses:
-            query_kwargs["filter"] = {
-                "or": [self._status_filter(name) for name in active_statuses]
+        schema = self.schema()
+        cached = self._active_query_cache
+        if cached is None or cached[0] is not schema:
+            active_statuses = self._active_status_names()
+            query_kwargs: Dict[str, Any] = {
+                "database_id": self.database_id,
+                "sorts": [{"property": "Due Date", "direction": "ascending"}],
             }
-        return query_kwargs, active_statuses
+            if active_statuses:
+                status_filter = self._active_status_filter(schema, active_statuses)
+                if status_filter:
+                    query_kwargs["filter"] = status_filter
+            cached = self._active_query_cache = (schema, query_kwargs, active_statuses)
+        _, query_kwargs, active_statuses = cached
+        # Shallow copy so callers can add e.g. start_cursor without touching the template
+        return dict(query_kwargs), active_statuses
 
     def list_active_tasks(self) -> List[Dict[str, Any]]:
         """Return non-completed tasks ordered by due date."""
         query_kwargs, active_statuses = self._active_tasks_query()
 
-        resp = self._query_db(**query_kwargs)
-        tasks = [self._page_to_task(p) for p in resp.get("results", [])]
+        tasks = [self._page_to_task(p) for p in self._query_db_all(**query_kwargs)]
 
         if not active_statuses:
             tasks = [
@@ -133,12 +350,57 @@ class NotionHelper:
 
         return tasks
 
+    def is_active_status(self, status: Optional[str]) -> bool:
+        """Whether a task with this status belongs in the active-task list."""
+        active_statuses = self._active_status_names()
+        if active_statuses:
+            return (status or "") in active_statuses
+        return (status or "").strip().lower() not in COMPLETE_GROUP_NAMES
+
+    @staticmethod
+    def latest_edit(tasks: List[Dict[str, Any]]) -> Optional[str]:
+        """Newest last_edited_time among ``tasks`` (ISO strings sort chronologically)."""
+        return max((t.get("last_edited_time") or "" for t in tasks), default="") or None
+
+    def list_active_tasks_incremental(
+        self, tasks: List[Dict[str, Any]], since: Optional[str]
+    ) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Merge pages edited on or after ``since`` into ``tasks`` and return the
+        merged list with the new watermark. Edited pages that are no longer
+        active are dropped. Without a watermark this is a full fetch.
+        Pages archived elsewhere are not seen; a full fetch catches those.
+        """
+        if not since:
+            tasks = self.list_active_tasks()
+            return tasks, self.latest_edit(tasks)
+
+        # Every status, so tasks that were just completed come back and can be removed.
+        # Notion timestamps are minute-granular, hence on_or_after rather than after.
+        edited = self._query_db_all(
+            database_id=self.database_id,
+            filter={"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}},
+        )
+        if not edited:
+            return tasks, since
+
+        merged = {t["id"]: t for t in tasks}
+        for page in edited:
+            task = self._page_to_task(page)
+            if self.is_active_status(task.get("status")):
+                merged[task["id"]] = task
+            else:
+                merged.pop(task["id"], None)
+
+        # Same order as the full query: due date ascending, undated last
+        result = sorted(merged.values(), key=lambda t: (t.get("due_date") is None, str(t.get("due_date") or "")))
+        return result, max(since, self.latest_edit(edited) or since)
+
     def list_active_task_pages(self) -> List[Dict[str, Any]]:
         """Return raw Notion pages for the active-task query."""
         query_kwargs, active_statuses = self._active_tasks_query()
         try:
-            resp = self._query_db(**query_kwargs)
-            results = resp.get("results", [])
+            results = self._query_db_all(**query_kwargs)
             if not active_statuses:
                 filtered = []
                 for page in results:
@@ -152,21 +414,61 @@ class NotionHelper:
             return []
 
     def list_completed_in_range(self, days: int = 7) -> List[Dict[str, Any]]:
-        since = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        resp = self._query_db(
-            database_id=self.database_id,
-            filter={
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        query_kwargs: Dict[str, Any] = {
+            "database_id": self.database_id,
+            "filter": {
                 "and": [
                     self._status_filter("Done"),
                     {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}},
                 ]
             },
-            sorts=[{"timestamp": "last_edited_time", "direction": "descending"}],
-        )
-        return [self._page_to_task(p) for p in resp.get("results", [])]
+            "sorts": [{"timestamp": "last_edited_time", "direction": "descending"}],
+        }
+        tasks: List[Dict[str, Any]] = []
+        # Each page is converted while the next one is being fetched
+        for chunk in self._iter_query_db(**query_kwargs):
+            tasks.extend(self._page_to_task(p) for p in chunk)
+        return tasks
+
+    def load_bundle(self, days: int = 7) -> TaskBundle:
+        """
+        Fetch the schema, active tasks and tasks completed in the last ``days``
+        for a dashboard load. Both task queries need the schema, so it is
+        resolved first; the two queries then run concurrently and still share
+        the rate limiter. The completed list is optional: if that query fails
+        it is None and the active tasks are still returned.
+        """
+        schema = self.schema()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            active = pool.submit(self.list_active_tasks)
+            completed = pool.submit(self.list_completed_in_range, days)
+            try:
+                completed_tasks: Optional[List[Dict[str, Any]]] = completed.result()
+            except Exception:
+                logger.warning("Recently completed tasks could not be loaded", exc_info=True)
+                completed_tasks = None
+            return TaskBundle(schema, active.result(), completed_tasks)
 
     def _page_to_task(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        # Unchanged pages (same last_edited_time, same schema) reuse the earlier
+        # conversion; callers get their own copy since they patch tasks in place
+        page_id, edited = page.get("id"), page.get("last_edited_time")
         schema = self.schema()
+        cached = self._task_cache.get(page_id) if page_id and edited else None
+        if cached is not None and cached[0] == edited and cached[1] is schema:
+            task = cached[2]
+        else:
+            task = self._convert_page(page)
+            if page_id and edited:
+                with self._task_cache_lock:
+                    self._task_cache[page_id] = (edited, schema, task)
+                    self._task_cache.move_to_end(page_id)
+                    while len(self._task_cache) > TASK_CACHE_MAX:
+                        self._task_cache.popitem(last=False)
+        return {**task, "properties": dict(task["properties"])}
+
+    def _convert_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
         props = page.get("properties", {})
         task: Dict[str, Any] = {
             "id": page.get("id"),
@@ -175,19 +477,17 @@ class NotionHelper:
             "_raw_properties": props,
         }
 
-        for prop_name, prop_schema in schema.items():
-            raw_value = props.get(prop_name)
-            value = self._extract_property_value(prop_name, prop_schema, raw_value)
+        for prop_name, extract, slug, is_title, is_notes in self._indexed_schema():
+            value = extract(props.get(prop_name) or {}) if extract else None
             task["properties"][prop_name] = value
 
-            slug = _slugify(prop_name)
             if slug:
                 task[slug] = value
 
-            if prop_schema.get("type") == "title":
+            if is_title:
                 task["title"] = value or "Untitled"
 
-            if prop_name in NOTES_PROPERTY_NAMES and value is not None:
+            if is_notes and value is not None:
                 task["notes"] = value
 
         # Fallback: add properties from payload even if missing in schema
@@ -197,7 +497,7 @@ class NotionHelper:
             pseudo_schema = {"type": raw_payload.get("type")}
             value = self._extract_property_value(prop_name, pseudo_schema, raw_payload)
             task["properties"][prop_name] = value
-            slug = _slugify(prop_name)
+            slug = slugify(prop_name)
             if slug and slug not in task:
                 task[slug] = value
             if raw_payload.get("type") == "title" and value:
@@ -221,14 +521,15 @@ class NotionHelper:
         defaults = defaults or {}
         for k, v in defaults.items():
             properties[k] = self._value_for_property(k, v)
-        page = self.client.pages.create(
+        page = throttled(
+            self.client.pages.create,
             parent={"database_id": self.database_id},
             properties=properties,
         )
         return page["id"]
 
     def delete_task(self, page_id: str):
-        self.client.pages.update(page_id=page_id, archived=True)
+        throttled(self.client.pages.update, page_id=page_id, archived=True)
 
     # ---------- Update ----------
     def update_property(self, page_id: str, property_name: str, new_value: Any) -> None:
@@ -236,21 +537,54 @@ class NotionHelper:
         if property_name not in schema:
             raise ValueError(f"Unknown property: {property_name}")
         notion_value = self._value_for_property(property_name, new_value)
-        self.client.pages.update(page_id=page_id, properties={property_name: notion_value})
+        throttled(self.client.pages.update, page_id=page_id, properties={property_name: notion_value})
 
-    def append_notes(self, page_id: str, text: str) -> None:
-        page = self.client.pages.retrieve(page_id=page_id)
+    def update_properties(self, page_id: str, name_to_value: Dict[str, Any]) -> None:
+        """Write several properties with one pages.update call."""
+        self.update_task_atomic(page_id, name_to_value)
+
+    def update_task_atomic(
+        self,
+        page_id: str,
+        props: Dict[str, Any],
+        append_text: Optional[str] = None,
+    ) -> None:
+        """
+        Apply several property changes, and optionally a timestamped notes
+        entry, with a single pages.update call.
+        """
+        schema = self.schema()
+        properties: Dict[str, Any] = {}
+        for name, value in props.items():
+            if name not in schema:
+                raise ValueError(f"Unknown property: {name}")
+            properties[name] = self._value_for_property(name, value)
+        if append_text:
+            properties["Notes or Description"] = self._appended_notes_payload(page_id, append_text)
+        if properties:
+            throttled(self.client.pages.update, page_id=page_id, properties=properties)
+
+    def append_notes(self, page_id: str, text: str, block_children: bool = False) -> None:
+        """
+        Add a timestamped note. By default it is prepended to the Notes
+        property; with ``block_children`` it is appended to the page body as a
+        paragraph instead (what the chat add_task_notes tool does), which never
+        re-sends earlier notes.
+        """
+        if block_children:
+            append_note_block(self.client, page_id, text)
+            return
+        self.update_task_atomic(page_id, {}, append_text=text)
+
+    def _appended_notes_payload(self, page_id: str, text: str) -> Dict[str, Any]:
+        page = throttled(self.client.pages.retrieve, page_id=page_id)
         props = page.get("properties", {})
         notes = props.get("Notes or Description", {})
-        current = ""
-        if notes.get("rich_text"):
-            current = notes["rich_text"][0].get("plain_text", "")
-        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M")
-        new_text = f"{current}\n\n[{timestamp}] {text}" if current else f"[{timestamp}] {text}"
-        self.client.pages.update(
-            page_id=page_id,
-            properties={"Notes or Description": {"rich_text": [{"text": {"content": new_text[:2000]}}]}},
-        )
+        current = _rich_text_to_plain(notes.get("rich_text") or []) or ""
+        entry = f"[{_note_timestamp()}] {text}"
+        # Newest first, so the 2000-char cap trims the oldest notes
+        new_text = f"{entry}\n\n{current}" if current else entry
+        return {"rich_text": [{"text": {"content": new_text[:2000]}}]}
 
     # ---------- Helpers ----------
     def _status_filter(self, value: str) -> Dict[str, Any]:
@@ -278,12 +612,45 @@ class NotionHelper:
 
         return {"property": "Status", key: payload}
 
+    def _active_status_filter(
+        self, schema: Dict[str, Any], active_statuses: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Filter matching the active statuses. A status property always holds a
+        value, so excluding the (usually one or two) complete options is
+        equivalent to OR-ing every active one and yields a smaller query.
+        Returns None when every option is active.
+        """
+        status_prop = schema.get("Status") or {}
+        if status_prop.get("type") == "status":
+            options = (status_prop.get("status") or {}).get("options") or []
+            active = set(active_statuses)
+            complete_names = [
+                opt["name"] for opt in options if opt.get("name") and opt["name"] not in active
+            ]
+            if not complete_names:
+                return None
+            if len(complete_names) < len(active_statuses):
+                return {
+                    "and": [
+                        {"property": "Status", "status": {"does_not_equal": name}}
+                        for name in complete_names
+                    ]
+                }
+        return {"or": [self._status_filter(name) for name in active_statuses]}
+
     def _active_status_names(self) -> List[str]:
         """
         Determine which Status options should be considered "active" by
         excluding groups named like Complete/Done when available.
         """
         schema = self.schema()
+        cached = self._active_names_cache
+        if cached is None or cached[0] is not schema:
+            cached = self._active_names_cache = (schema, self._compute_active_status_names(schema))
+        return cached[1]
+
+    def _compute_active_status_names(self, schema: Dict[str, Any]) -> List[str]:
         status_prop = schema.get("Status")
         if not status_prop:
             return []
@@ -336,58 +703,8 @@ class NotionHelper:
         prop_schema: Dict[str, Any],
         prop_payload: Optional[Dict[str, Any]],
     ) -> Any:
-        ptype = prop_schema.get("type")
-        payload = prop_payload or {}
-
-        if ptype == "title":
-            return _rich_text_to_plain(payload.get("title", [])) or "Untitled"
-
-        if ptype == "rich_text":
-            return _rich_text_to_plain(payload.get("rich_text", []))
-
-        if ptype == "select":
-            selected = payload.get("select")
-            return selected.get("name") if selected else None
-
-        if ptype == "status":
-            selected = payload.get("status")
-            return selected.get("name") if selected else None
-
-        if ptype == "multi_select":
-            return [
-                opt.get("name")
-                for opt in payload.get("multi_select", [])
-                if opt.get("name")
-            ]
-
-        if ptype == "number":
-            return payload.get("number")
-
-        if ptype == "date":
-            date_obj = payload.get("date")
-            return date_obj.get("start") if date_obj else None
-
-        if ptype == "checkbox":
-            return payload.get("checkbox")
-
-        if ptype == "url":
-            return payload.get("url")
-
-        if ptype == "email":
-            return payload.get("email")
-
-        if ptype == "phone_number":
-            return payload.get("phone_number")
-
-        if ptype == "people":
-            people = payload.get("people") or []
-            return [
-                person.get("name") or person.get("id")
-                for person in people
-                if person.get("name") or person.get("id")
-            ]
-
-        return None
+        extract = _EXTRACTORS.get(prop_schema.get("type"))
+        return extract(prop_payload or {}) if extract else None
 
     def _value_for_property(self, property_name: str, value: Any) -> Dict[str, Any]:
         schema = self.schema()
@@ -395,58 +712,75 @@ class NotionHelper:
         if not prop_schema:
             raise ValueError(f"Unknown property: {property_name}")
 
-        prop_type = prop_schema.get("type")
-
-        if prop_type == "title":
-            content = "" if value is None else str(value)
-            return {"title": [{"text": {"content": content}}]}
-
-        if prop_type == "rich_text":
-            content = "" if value is None else str(value)
-            if not content:
-                return {"rich_text": []}
-            return {"rich_text": [{"text": {"content": content}}]}
-
-        if prop_type == "number":
-            if value in (None, ""):
-                return {"number": None}
-            try:
-                return {"number": float(value)}
-            except (TypeError, ValueError):
-                return {"number": None}
-
-        if prop_type == "date":
-            if not value:
-                return {"date": None}
-            return {"date": {"start": str(value)}}
-
-        if prop_type == "select":
-            if not value:
-                return {"select": None}
-            return {"select": {"name": str(value)}}
-
-        if prop_type == "status":
-            if not value:
-                return {"status": None}
-            return {"status": {"name": str(value)}}
-
-        if prop_type == "multi_select":
-            if not value:
-                return {"multi_select": []}
-            if not isinstance(value, (list, tuple, set)):
-                value = [value]
-            return {"multi_select": [{"name": str(v)} for v in value if v not in (None, "")]}
-
-        if prop_type == "checkbox":
-            return {"checkbox": bool(value)}
-
-        if prop_type == "url":
-            return {"url": value or None}
-
-        if prop_type == "email":
-            return {"email": value or None}
-
-        if prop_type == "phone_number":
-            return {"phone_number": value or None}
-
-        return {"rich_text": [] if value in (None, "") else [{"text": {"content": str(value)}}]}
+        encode = _ENCODERS.get(prop_schema.get("type"), _encode_fallback)
+        return encode(value)
+
+
+# ---------- Property codecs ----------
+# Dispatch on the Notion property type: one dict lookup instead of an if/elif chain
+def _extract_people(payload: Dict[str, Any]) -> List[Any]:
+    people = payload.get("people") or []
+    return [
+        person.get("name") or person.get("id")
+        for person in people
+        if person.get("name") or person.get("id")
+    ]
+
+
+_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "title": lambda p: _rich_text_to_plain(p.get("title", [])) or "Untitled",
+    "rich_text": lambda p: _rich_text_to_plain(p.get("rich_text", [])),
+    "select": lambda p: (p.get("select") or {}).get("name"),
+    "status": lambda p: (p.get("status") or {}).get("name"),
+    "multi_select": lambda p: [opt.get("name") for opt in p.get("multi_select", []) if opt.get("name")],
+    "number": lambda p: p.get("number"),
+    "date": lambda p: (p.get("date") or {}).get("start"),
+    "checkbox": lambda p: p.get("checkbox"),
+    "url": lambda p: p.get("url"),
+    "email": lambda p: p.get("email"),
+    "phone_number": lambda p: p.get("phone_number"),
+    "people": _extract_people,
+}
+
+
+def _encode_rich_text(value: Any) -> Dict[str, Any]:
+    content = "" if value is None else str(value)
+    if not content:
+        return {"rich_text": []}
+    return {"rich_text": [{"text": {"content": content}}]}
+
+
+def _encode_number(value: Any) -> Dict[str, Any]:
+    if value in (None, ""):
+        return {"number": None}
+    try:
+        return {"number": float(value)}
+    except (TypeError, ValueError):
+        return {"number": None}
+
+
+def _encode_multi_select(value: Any) -> Dict[str, Any]:
+    if not value:
+        return {"multi_select": []}
+    if not isinstance(value, (list, tuple, set)):
+        value = [value]
+    return {"multi_select": [{"name": str(v)} for v in value if v not in (None, "")]}
+
+
+def _encode_fallback(value: Any) -> Dict[str, Any]:
+    return {"rich_text": [] if value in (None, "") else [{"text": {"content": str(value)}}]}
+
+
+_ENCODERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "title": lambda v: {"title": [{"text": {"content": "" if v is None else str(v)}}]},
+    "rich_text": _encode_rich_text,
+    "number": _encode_number,
+    "date": lambda v: {"date": {"start": str(v)} if v else None},
+    "select": lambda v: {"select": {"name": str(v)} if v else None},
+    "status": lambda v: {"status": {"name": str(v)} if v else None},
+    "multi_select": _encode_multi_select,
+    "checkbox": lambda v: {"checkbox": bool(v)},
+    "url": lambda v: {"url": v or None},
+    "email": lambda v: {"email": v or None},
+    "phone_number": lambda v: {"phone_number": v or None},
+}
@@ -2,29 +2,33 @@ import streamlit as st
 from typing import List, Dict, Any
 from datetime import datetime
 
+try:
+    from streamlit_autorefresh import st_autorefresh
+except ImportError:  # optional component; auto-refresh is a no-op without it
+    st_autorefresh = None
+
 # Simple live refresh control using Streamlit's autorefresh
 
-def setup_autorefresh(seconds: int = 120):
-    """Enable periodic page refresh to pick up external Notion edits."""
+def setup_autorefresh(seconds: int = 120) -> int:
+    """Enable periodic page refresh to pick up external Notion edits.
+
+    Returns the autorefresh tick count (0 when disabled) so callers can tell
+    timer-driven reruns apart from user interactions.
+    """
     st.sidebar.checkbox(
         "🔁 Auto-refresh", value=st.session_state.get("auto_refresh", False), key="auto_refresh",
         help=f"If checked, the page refreshes every {seconds} s to reflect external edits."
     )
     if st.session_state.get("auto_refresh"):
-        st.experimental_rerun  # noop alias to hint behavior
         st.sidebar.caption("Auto-refresh is on")
-        # streamlit has st_autorefresh, avoid import ambiguity by lazy call
-        try:
-            from streamlit_autorefresh import st_autorefresh
-            st_autorefresh(interval=seconds * 1000, limit=None, key="refresh_key")
-        except Exception:
-            pass
+        if st_autorefresh is not None:
+            return st_autorefresh(interval=seconds * 1000, limit=None, key="refresh_key") or 0
+    return 0
 
 # Compute diffs for partial updates
 
 def diff_properties(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
-    changed = {}
-    for k, v in new.items():
-        if old.get(k) != v:
-            changed[k] = v
-    return changed
+    if old == new:
+        return {}
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
@@ -0,0 +1,47 @@
+# Claude tool definitions. A tuple so nothing can mutate the schema between
+# calls; the tools prefix stays byte-identical and keeps hitting the cache.
+
+TOOLS = (
+    {
+        "name": "update_task_status",
+        "description": "Update the status of a task in Notion. Use this when the user reports completing a task or changing its status.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "task_title": {
+                    "type": "string",
+                    "description": "The title/name of the task to update",
+                },
+                "new_status": {
+                    "type": "string",
+                    "enum": ["To Do", "In Progress", "Done", "Blocked"],
+                    "description": "The new status for the task",
+                },
+            },
+            "required": ["task_title", "new_status"],
+        },
+    },
+    {
+        "name": "add_task_notes",
+        "description": "Add notes or learnings to a task in Notion. Use this when the user shares insights or progress details.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "task_title": {
+                    "type": "string",
+                    "description": "The title/name of the task",
+                },
+                "notes": {
+                    "type": "string",
+                    "description": "The notes to add",
+                },
+            },
+            "required": ["task_title", "notes"],
+        },
+        # Cache breakpoint: Anthropic caches every tool definition up to here
+        "cache_control": {"type": "ephemeral"},
+    },
+)
+
+# Tools that change Notion data; read-only tools must not invalidate task state
+WRITE_TOOLS = frozenset({"update_task_status", "add_task_notes"})
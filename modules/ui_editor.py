@@ -1,8 +1,9 @@
 import streamlit as st
+import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
-from .notion_utils import NotionHelper, NOTES_PROPERTY_NAMES
+from .notion_utils import NotionHelper, NOTES_PROPERTY_NAMES, slugify
 
 # ----- UI helpers -----
 
@@ -33,10 +34,6 @@ SECTION_RULES: List[Tuple[str, set[str]]] = [
 ]
 
 
-def _slugify(name: str) -> str:
-    return "_".join(name.lower().split())
-
-
 def _build_sections(schema: Dict[str, Any]) -> List[Tuple[str, List[str]]]:
     buckets: Dict[str, List[str]] = {section: [] for section, _ in SECTION_RULES}
     buckets["Other"] = []
@@ -63,6 +60,106 @@ def _build_sections(schema: Dict[str, Any]) -> List[Tuple[str, List[str]]]:
     return ordered_sections
 
 
+# ----- Autosave debounce -----
+# Autosaved edits are queued per page and written as one pages.update once
+# the burst has been idle for AUTOSAVE_DEBOUNCE_SECONDS.
+AUTOSAVE_DEBOUNCE_SECONDS = 0.5
+
+
+def _queue_autosave(page_id: str, prop_name: str, old: Any, new: Any, on_change_log) -> None:
+    pending = st.session_state.setdefault("_pending_props", {})
+    entry = pending.setdefault(page_id, {"log": on_change_log, "changes": {}})
+    entry["log"] = on_change_log
+    if prop_name in entry["changes"]:
+        # Keep the value from before the burst so the log shows the full change
+        old = entry["changes"][prop_name][0]
+    entry["changes"][prop_name] = (old, new)
+    st.session_state["_pending_since"] = time.monotonic()
+    # A new edit retries anything left over from a failed flush
+    st.session_state.pop("_autosave_error", None)
+
+
+def flush_pending_autosaves(notion: NotionHelper, force: bool = False) -> bool:
+    """
+    Write queued autosave changes, one update per touched page. A page leaves
+    the queue only once its write succeeds; failures are kept for the next
+    attempt and reported through ``_autosave_error``. Returns True when a
+    flush was attempted.
+    """
+    pending = st.session_state.get("_pending_props")
+    if not pending:
+        return False
+    since = st.session_state.get("_pending_since", 0.0)
+    if not force and time.monotonic() - since < AUTOSAVE_DEBOUNCE_SECONDS:
+        return False
+
+    st.session_state.pop("_pending_since", None)
+    st.session_state.pop("_autosave_error", None)
+    for page_id, entry in list(pending.items()):
+        changes = entry["changes"]
+        try:
+            notion.update_properties(page_id, {prop: new for prop, (_, new) in changes.items()})
+        except Exception as exc:  # noqa: BLE001
+            st.session_state["_autosave_error"] = str(exc)
+            continue
+        del pending[page_id]
+        for prop, (old, new) in changes.items():
+            entry["log"](prop, old, new)
+    return True
+
+
+@st.fragment(run_every=AUTOSAVE_DEBOUNCE_SECONDS)
+def _autosave_flusher(notion: NotionHelper):
+    if flush_pending_autosaves(notion) or not st.session_state.get("_pending_props"):
+        # A full rerun drops this timer (the queue is empty or parked on an
+        # error) and lets the sidebar show the outcome
+        st.rerun(scope="app")
+
+
+FieldSpec = Tuple[str, Dict[str, Any], Optional[str], List[str], Dict[str, str]]
+
+
+def _field_specs(schema: Dict[str, Any]) -> List[Tuple[str, List[FieldSpec]]]:
+    """Resolve per-field widget metadata (type, options, badge colors) for the editor."""
+    specs: List[Tuple[str, List[FieldSpec]]] = []
+    for section, fields in _build_sections(schema):
+        entries: List[FieldSpec] = []
+        for prop_name in fields:
+            prop_info = schema[prop_name]
+            ptype = prop_info.get("type")
+            options: List[str] = []
+            colors: Dict[str, str] = {}
+            if ptype in ("select", "status", "multi_select"):
+                options_data = (prop_info.get(ptype, {}) or {}).get("options", [])
+                options = [opt.get("name") for opt in options_data if opt.get("name")]
+                if ptype != "multi_select":
+                    colors = {
+                        opt.get("name"): COLOR_MAP.get((opt.get("color") or "default"), "#ddd")
+                        for opt in options_data
+                        if opt.get("name")
+                    }
+            entries.append((prop_name, prop_info, ptype, options, colors))
+        specs.append((section, entries))
+    return specs
+
+
+# (schema, specs) for the last schema object seen. NotionHelper is shared per
+# process, so one entry serves every session until the schema is swapped.
+_SPECS_CACHE: Optional[Tuple[Dict[str, Any], List[Tuple[str, List[FieldSpec]]]]] = None
+
+
+def _cached_field_specs(schema: Dict[str, Any]) -> List[Tuple[str, List[FieldSpec]]]:
+    # Specs depend only on the schema, so reruns for the same schema object
+    # skip sectioning and the property-type inference.
+    global _SPECS_CACHE
+    cached = _SPECS_CACHE
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    specs = _field_specs(schema)
+    _SPECS_CACHE = (schema, specs)
+    return specs
+
+
 def _mark_dirty(flag_key: str):
     st.session_state[flag_key] = True
 
@@ -80,11 +177,11 @@ def _current_value(task: Dict[str, Any], prop_name: str) -> Any:
     props = task.get("properties") or {}
     if prop_name in props:
         return props[prop_name]
-    return task.get(_slugify(prop_name))
+    return task.get(slugify(prop_name))
 
 
 def _update_cached_task(task: Dict[str, Any], prop_name: str, prop_info: Dict[str, Any], value: Any) -> None:
-    slug = _slugify(prop_name)
+    slug = slugify(prop_name)
     task[slug] = value
     props = task.setdefault("properties", {})
     props[prop_name] = value
@@ -97,7 +194,7 @@ def _update_cached_task(task: Dict[str, Any], prop_name: str, prop_info: Dict[st
 
 def render_dynamic_editor(notion: NotionHelper, selected_task: Dict[str, Any], autosave: bool, on_change_log):
     schema = notion.schema()
-    sections = _build_sections(schema)
+    sections = _cached_field_specs(schema)
 
     st.sidebar.subheader("Editor")
     st.sidebar.caption("Edit fields below. Use Auto-Save to apply instantly.")
@@ -106,18 +203,15 @@ def render_dynamic_editor(notion: NotionHelper, selected_task: Dict[str, Any], a
         st.sidebar.info("No editable properties found in this database.")
         return False
 
-    properties_map = selected_task.setdefault("properties", {})
-    original = selected_task.copy()
-    original["properties"] = dict(properties_map)
-
-    pending_updates: Dict[str, Any] = {}
+    selected_task.setdefault("properties", {})
+    # prop -> (value before this edit, new value); the old value is captured in
+    # the loop, so no per-rerun copy of the task is needed
+    pending_updates: Dict[str, Tuple[Any, Any]] = {}
     save_banner = st.sidebar.empty()
 
     for section, fields in sections:
         with st.sidebar.expander(section, expanded=True):
-            for prop_name in fields:
-                prop_info = schema[prop_name]
-                ptype = prop_info.get("type")
+            for prop_name, prop_info, ptype, options, colors in fields:
                 key = f"{selected_task['id']}_{prop_name}"
                 dirty_key = f"{key}__dirty"
                 if dirty_key not in st.session_state:
@@ -127,14 +221,6 @@ def render_dynamic_editor(notion: NotionHelper, selected_task: Dict[str, Any], a
                 new_val: Any = current_value
 
                 if ptype in ("select", "status"):
-                    select_meta = prop_info.get(ptype, {}) or {}
-                    options_data = select_meta.get("options", [])
-                    options = [opt.get("name") for opt in options_data if opt.get("name")]
-                    colors = {
-                        opt.get("name"): COLOR_MAP.get((opt.get("color") or "default"), "#ddd")
-                        for opt in options_data
-                        if opt.get("name")
-                    }
                     display_options = [NONE_OPTION] + options
                     try:
                         default_index = display_options.index(current_value)
@@ -155,14 +241,8 @@ def render_dynamic_editor(notion: NotionHelper, selected_task: Dict[str, Any], a
                             _badge(opt, colors.get(opt))
 
                 elif ptype == "multi_select":
-                    options_data = prop_info.get("multi_select", {}) or {}
-                    base_options = [
-                        opt.get("name")
-                        for opt in options_data.get("options", [])
-                        if opt.get("name")
-                    ]
                     current_list = current_value or []
-                    display_options = list(dict.fromkeys(base_options + current_list))
+                    display_options = list(dict.fromkeys(options + current_list))
                     new_val = st.sidebar.multiselect(
                         prop_name,
                         display_options,
@@ -233,29 +313,34 @@ def render_dynamic_editor(notion: NotionHelper, selected_task: Dict[str, Any], a
                 changed = _value_changed(current_value, new_val, dirty)
 
                 if autosave and changed:
-                    notion.update_property(selected_task["id"], prop_name, new_val)
-                    on_change_log(prop_name, current_value, new_val)
-                    save_banner.info(f"Saved {prop_name} at {datetime.now().strftime('%H:%M:%S')}")
+                    _queue_autosave(selected_task["id"], prop_name, current_value, new_val, on_change_log)
+                    save_banner.info(f"Saving {prop_name} at {datetime.now().strftime('%H:%M:%S')}")
                     _update_cached_task(selected_task, prop_name, prop_info, new_val)
                 else:
                     if changed:
-                        pending_updates[prop_name] = new_val
+                        pending_updates[prop_name] = (current_value, new_val)
                     else:
                         pending_updates.pop(prop_name, None)
 
                 st.session_state[dirty_key] = False
 
+    # Turning autosave off flushes immediately; otherwise wait out the burst.
+    # After a failed autosave the queue waits for the next edit instead of
+    # retrying on a timer.
+    if st.session_state.get("_pending_props") and (
+        not autosave or "_autosave_error" not in st.session_state
+    ):
+        if not flush_pending_autosaves(notion, force=not autosave):
+            _autosave_flusher(notion)
+    if "_autosave_error" in st.session_state:
+        st.sidebar.error(f"Autosave failed; unsaved edits are kept: {st.session_state['_autosave_error']}")
+
     if not autosave and st.sidebar.button("dY'_ Save All Changes"):
-        desired: Dict[str, Any] = {}
-        original_props = original.get("properties", {})
-        for prop, val in pending_updates.items():
-            if original_props.get(prop) != val:
-                desired[prop] = val
+        desired = {prop: (old, val) for prop, (old, val) in pending_updates.items() if old != val}
 
         if desired:
-            for prop, val in desired.items():
-                old_val = original_props.get(prop)
-                notion.update_property(selected_task["id"], prop, val)
+            notion.update_properties(selected_task["id"], {prop: val for prop, (_, val) in desired.items()})
+            for prop, (old_val, val) in desired.items():
                 on_change_log(prop, old_val, val)
                 _update_cached_task(selected_task, prop, schema[prop], val)
             st.sidebar.success("Saved")